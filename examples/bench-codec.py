@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from argo_ams_library import AmsMessage
+from argo_ams_library.amscompress import PAYLOAD_CODECS
+
+import json
+import random
+import time
+
+
+def payload(size):
+    """Verbose JSON metric results of approximately size bytes"""
+
+    results = list()
+    i = 0
+    while len(json.dumps(results)) < size:
+        results.append({"hostname": "host{0}.example.com".format(random.randint(0, 500)),
+                        "metric": "org.nagios.CertLifetime-{0}".format(i % 13),
+                        "status": random.choice(["OK", "WARNING", "CRITICAL", "UNKNOWN"]),
+                        "timestamp": "2024-03-15T17:{0:02d}:{1:02d}Z".format(i % 60, random.randint(0, 59)),
+                        "summary": "Certificate will expire in {0} days".format(random.randint(1, 400))})
+        i += 1
+    return json.dumps(results)
+
+
+def bench(data, codec, repeat):
+    start = time.time()
+    for i in range(repeat):
+        sent = AmsMessage(data=data, codec=codec).dict()
+    encode = (time.time() - start) / repeat
+
+    start = time.time()
+    for i in range(repeat):
+        AmsMessage(b64enc=False, **sent).get_data()
+    decode = (time.time() - start) / repeat
+
+    return len(sent['data']), encode, decode
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark payload codecs against plain Base64")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2048, 10240, 51200],
+                        help='Payload sizes in bytes')
+    parser.add_argument('--repeat', type=int, default=200, help='Repetitions of each measurement')
+    args = parser.parse_args()
+
+    random.seed(0)
+    codecs = [None] + [name for name, functions in sorted(PAYLOAD_CODECS.items()) if functions]
+    for size in args.sizes:
+        data = payload(size)
+        for codec in codecs:
+            wire, encode, decode = bench(data, codec, args.repeat)
+            print('{0:>6} bytes  {1:<7} {2:>7} bytes on wire  encode {3:>8.1f} MB/s  decode {4:>8.1f} MB/s'.format(
+                len(data), codec or 'base64', wire, len(data) / encode / 1e6, len(data) / decode / 1e6))
+
+
+main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from argo_ams_library import AmsMessage
+from argo_ams_library.amscompress import compress, CONTENT_ENCODINGS
+
+import json
+import random
+import time
+
+
+def metric_result(i):
+    """Representative verbose JSON metric result"""
+
+    return json.dumps({
+        "hostname": "host{0}.example.com".format(i % 200),
+        "service": "eu.egi.CREAM-CE",
+        "metric": "emi.cream.CREAMCE-JobSubmit",
+        "timestamp": "2024-03-15T17:11:{0:02d}Z".format(i % 60),
+        "status": random.choice(["OK", "WARNING", "CRITICAL"]),
+        "summary": "Job was successfully submitted and finished",
+        "message": "Job submitted to queue {0}, waited {1} seconds".format(i % 7, i % 300),
+        "tags": {"site": "SITE-{0}".format(i % 40), "vo": "ops", "monitoring_host": "mon.example.com"},
+    })
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark compression of publish bodies")
+    parser.add_argument('--batch', type=int, default=100, help='Number of messages in publish request')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of compressed requests')
+    args = parser.parse_args()
+
+    random.seed(0)
+    msgs = [AmsMessage(data=metric_result(i), attributes={'type': 'metric'}).dict()
+            for i in range(args.batch)]
+    body = json.dumps({"messages": msgs}).encode('utf-8')
+    print('{0} messages, {1} bytes uncompressed, {2:.0f} bytes/message'.format(
+        args.batch, len(body), len(body) / float(args.batch)))
+
+    for encoding in CONTENT_ENCODINGS:
+        for level in [1, 6, 9]:
+            start = time.process_time()
+            for i in range(args.repeat):
+                compressed = compress(body, encoding, level)
+            cpu = (time.process_time() - start) / args.repeat / args.batch
+            print('{0:<8} level {1}  {2:>8} bytes  ratio {3:>5.2f}  {4:>7.2f} us CPU/message'.format(
+                encoding, level, len(compressed), len(body) / float(len(compressed)), cpu * 1e6))
+
+
+main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from argo_ams_library import AmsMessage, get_json_codec
+
+import json
+import time
+
+
+def publish_body(num):
+    return {"messages": [AmsMessage(data='metric result {0}'.format(i) * 10,
+                                    attributes={'host': 'host{0}'.format(i),
+                                                'service': 'service'}).dict()
+                         for i in range(num)]}
+
+
+def pull_response(num):
+    msgs = [{"ackId": "projects/BENCH/subscriptions/sub:{0}".format(i),
+             "message": dict(m, messageId=str(i),
+                             publishTime="2016-02-24T11:55:09.786127994Z")}
+            for i, m in enumerate(publish_body(num)["messages"])]
+    return json.dumps({"receivedMessages": msgs}).encode('utf-8')
+
+
+def bench(func, repeat):
+    start = time.time()
+    for i in range(repeat):
+        func()
+    return (time.time() - start) / repeat * 1000
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark JSON codecs on publish and pull bodies")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help='Number of messages per request')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetitions of each measurement')
+    args = parser.parse_args()
+
+    codecs = list()
+    for name in ['json', 'ujson', 'orjson']:
+        try:
+            codecs.append(get_json_codec(name))
+        except ImportError:
+            print('{0} is not installed, skipping'.format(name))
+
+    for num in args.sizes:
+        body, response = publish_body(num), pull_response(num)
+        for codec in codecs:
+            enc = bench(lambda: codec.dumps(body), args.repeat)
+            dec = bench(lambda: codec.loads(response), args.repeat)
+            print('{0:>6} msgs  {1:<7} encode publish {2:>8.2f} ms  decode pull {3:>8.2f} ms'.format(
+                num, codec.name, enc, dec))
+
+
+main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from argo_ams_library import AmsMessage
+from base64 import b64encode
+
+import gc
+import json
+import time
+import tracemalloc
+
+
+class LegacyMessage(object):
+    """AmsMessage.dict() as it was implemented with eval() and without
+       __slots__, kept for comparison"""
+
+    def __init__(self, attributes='', data=None, messageId='', publishTime=''):
+        self._attributes = attributes
+        self._messageId = messageId
+        self._publishTime = publishTime
+        self._data = str(b64encode(bytearray(data, 'utf-8')), 'utf-8')
+
+    def dict(self):
+        d = dict()
+        for attr in ['attributes', 'data', 'messageId', 'publishTime']:
+            if getattr(self, '_{0}'.format(attr), False):
+                v = eval('self._{0}'.format(attr))
+                d.update({attr: v})
+        return d
+
+
+def bench(label, cls, num):
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    msgs = [cls(data='foo{0}'.format(i), attributes={'bar': 'baz'}) for i in range(num)]
+    built = time.time()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    body = json.dumps({"messages": [m.dict() for m in msgs]})
+    serialized = time.time()
+
+    print('{0:<10} build {1:>7.2f}s  serialize {2:>7.2f}s  {3:>10.0f} msg/s  peak {4:>7.1f} MiB'.format(
+        label, built - start, serialized - built, num / (serialized - built),
+        peak / 1024.0 / 1024.0))
+    return len(body)
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark building and serializing of AmsMessage objects")
+    parser.add_argument('--messages', type=int, default=1000000, help='Number of messages')
+    args = parser.parse_args()
+
+    bench('legacy', LegacyMessage, args.messages)
+    bench('AmsMessage', AmsMessage, args.messages)
+
+
+main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from argo_ams_library import ArgoMessagingService, AmsMessage
+
+import time
+
+
+class StubResponse(object):
+    status_code = 200
+    content = b'{"messageIds": ["1"]}'
+
+
+class StubSession(object):
+    """Session answering every request without network so that only
+       client side overhead is measured"""
+
+    def post(self, url, data=None, **kwargs):
+        return StubResponse()
+
+    def close(self):
+        pass
+
+
+def bench(label, func, num):
+    start = time.time()
+    for i in range(num):
+        func()
+    elapsed = time.time() - start
+    print('{0:<36} {1:>8.2f} us/call'.format(label, elapsed / num * 1e6))
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark client side overhead of route composition")
+    parser.add_argument('--calls', type=int, default=200000, help='Number of calls')
+    args = parser.parse_args()
+
+    ams = ArgoMessagingService(endpoint='localhost', token='s3cr3t', project='BENCH',
+                               session=StubSession())
+
+    def uncached():
+        route = ams.routes["topic_publish"]
+        return (route[1].format(ams.endpoint, ams.project, 'topic'),
+                getattr(ams, 'do_{0}'.format(route[0])))
+
+    bench('route composition', uncached, args.calls)
+    bench('cached route', lambda: ams._project_route("topic_publish", "topic"), args.calls)
+
+    msg = AmsMessage(data='foo')
+    bench('publish with stub session', lambda: ams.publish('topic', msg), args.calls // 10)
+
+    def publish_invalidated():
+        ams.project = 'BENCH'
+        ams.publish('topic', msg)
+
+    bench('publish with route cache reset', publish_invalidated, args.calls // 10)
+
+
+main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from argo_ams_library import ArgoMessagingService, AmsMessage
+
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import urllib3
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal AMS stub answering every publish with one messageId"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{"messageIds": ["1"]}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.headers.get('Connection', '').lower() == 'close':
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def gen_cert(tmpdir):
+    cert = os.path.join(tmpdir, 'cert.pem')
+    key = os.path.join(tmpdir, 'key.pem')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048',
+                           '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                           '-keyout', key, '-out', cert],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+def start_server(cert, key):
+    server = StubServer(('localhost', 0), StubHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    t = threading.Thread(target=server.serve_forever)
+    t.daemon = True
+    t.start()
+    return server
+
+
+def bench(label, func, num):
+    start = time.time()
+    for i in range(num):
+        func()
+    elapsed = time.time() - start
+    print('{0:<28} {1:>8.2f} ms/request'.format(label, elapsed / num * 1000))
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark pooled session against new connection per request")
+    parser.add_argument('--certfile', type=str, help='TLS certificate of the stub server, generated with openssl if omitted')
+    parser.add_argument('--keyfile', type=str, help='TLS key of the stub server')
+    parser.add_argument('--requests', type=int, default=500, help='Number of publish requests')
+    args = parser.parse_args()
+
+    urllib3.disable_warnings()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        cert, key = args.certfile, args.keyfile
+        if not cert:
+            cert, key = gen_cert(tmpdir)
+        server = start_server(cert, key)
+        endpoint = 'localhost:{0}'.format(server.server_address[1])
+        msg = AmsMessage(data='foo', attributes={'bar': 'baz'})
+
+        ams = ArgoMessagingService(endpoint=endpoint, token='s3cr3t', project='BENCH')
+        bench('pooled session', lambda: ams.publish('topic', msg, verify=False), args.requests)
+
+        nopool = ArgoMessagingService(endpoint=endpoint, token='s3cr3t', project='BENCH', keepalive=False)
+        bench('connection per request', lambda: nopool.publish('topic', msg, verify=False), args.requests)
+
+        server.shutdown()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+main()
@@ -1,4 +1,5 @@
 import logging
+import sys
 
 try:
     from logging import NullHandler
@@ -11,8 +12,21 @@ logging.getLogger(__name__).addHandler(NullHandler())
 from .ams import ArgoMessagingService
 from .amsexceptions import (AmsServiceException, AmsBalancerException,
                             AmsConnectionException, AmsTimeoutException,
-                            AmsMessageException, AmsException)
-from .amsmsg import AmsMessage
+                            AmsMessageException, AmsException,
+                            AmsCircuitOpenException)
+from .amsjson import AmsJsonCodec, get_json_codec
+from .amsmsg import AmsMessage, AmsMessageBatch
 from .amstopic import AmsTopic
+from .amspublisher import AmsBatchPublisher
+from .amsregistry import AmsRegistry
+from .amsretry import AmsRetryPolicy, AmsRetryBudget
 from .amssubscription import AmsSubscription
-from .amsuser import AmsUser, AmsUserProject
+from .amsack import AmsAckManager
+from .amsbreaker import AmsCircuitBreaker
+from .amsbulk import AmsBulkResult
+from .amsscheduler import AmsConsumerScheduler
+from .amsuser import AmsUser, AmsUserProject, AmsUserRecord
+
+if sys.version_info >= (3, 6):
+    from .amsasync import (AsyncArgoMessagingService, AmsAsyncTransport,
+                           AmsAiohttpTransport, AmsThreadTransport)
@@ -1,3 +1,4 @@
+import codecs
 import json
 import logging
 import logging.handlers
@@ -5,15 +6,25 @@ import requests
 import socket
 import sys
 import datetime
+import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 from .amsexceptions import (AmsServiceException, AmsConnectionException,
                             AmsMessageException, AmsException,
                             AmsTimeoutException, AmsBalancerException)
-from .amsmsg import AmsMessage
+from .amsack import unseen_messages
+from .amsbulk import AmsBulkResult, VERIFIED_OPERATIONS, parse_operation
+from .amscompress import CONTENT_ENCODINGS, compress
+from .amsendpoint import AmsEndpointPool
+from .amsjson import get_json_codec
+from .amsmsg import AmsMessage, AmsMessageBatch
+from .amsregistry import AmsRegistry
+from .amsretry import AmsRetryStats
 from .amstopic import AmsTopic
 from .amssubscription import AmsSubscription
-from .amsuser import AmsUser, AmsUserPage, AmsUserProject
+from .amsuser import AmsUser, AmsUserPage, AmsUserProject, AmsUserRecord
 
 try:
     from collections import OrderedDict
@@ -31,10 +42,53 @@ class AmsHttpRequests(object):
        status codes returned by service and the balancer.
     """
 
-    def __init__(self, endpoint, authn_port, token="", cert="", key=""):
+    def __init__(self, endpoint, authn_port, token="", cert="", key="",
+                 session=None, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keepalive=True, json_codec=None,
+                 compression=None, compression_level=6,
+                 compression_threshold=1024, retry_policy=None,
+                 route_retry_policies=None, circuit_breaker=None,
+                 endpoint_strategy='least_outstanding', endpoint_cooldown=30):
+        # requests are balanced between endpoints when list of them is given
+        self.endpoint_pool = None
+        if isinstance(endpoint, (list, tuple)):
+            self.endpoint_pool = AmsEndpointPool(endpoint, strategy=endpoint_strategy,
+                                                 cooldown=endpoint_cooldown)
+            endpoint = endpoint[0]
+        # URLs and request methods of routes per resource, reset when
+        # endpoint or project change. At most route_cache_size of them are
+        # kept, the earliest composed ones are dropped first.
+        self.route_cache_size = 1024
+        self._route_cache = OrderedDict()
+        self._route_lock = threading.Lock()
+        self._project = ""
         self.endpoint = endpoint
         self.authn_port = authn_port
         self.token = token
+        # codec serializing request bodies and decoding responses
+        self.json_codec = get_json_codec(json_codec)
+
+        # content coding of request bodies larger than threshold
+        if compression is not None and compression not in CONTENT_ENCODINGS:
+            raise ValueError('Unsupported compression {0}'.format(compression))
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+
+        # retry policy of all routes and policies overriding it per route
+        self.retry_policy = retry_policy
+        self.route_retry_policies = dict(route_retry_policies or {})
+        self._retry_stats = AmsRetryStats()
+
+        # failing routes are short-circuited when breaker is set
+        self.circuit_breaker = circuit_breaker
+
+        # HTTP session shared by all requests so that TCP and TLS connections
+        # to the AMS endpoint are pooled and reused between calls
+        if session is None:
+            session = self._build_session(pool_connections, pool_maxsize,
+                                          pool_block, keepalive)
+        self.session = session
 
         # Create route list
         self.routes = {
@@ -92,6 +146,13 @@ class AmsHttpRequests(object):
             "auth_x509": ["get", "https://{0}:{1}/v1/service-types/ams/hosts/{0}:authx509"],
         }
 
+        # routes with compressed request bodies
+        self.compress_routes = ("topic_publish",)
+
+        # idempotent routes whose requests fail over to the next endpoint
+        self.failover_routes = set(r for r in self.routes
+                                   if r.endswith(('_get', '_list')) or r == 'sub_offsets')
+
         # HTTP error status codes returned by AMS according to:
         # http://argoeu.github.io/messaging/v1/api_errors/
         self.ams_errors_route = {
@@ -145,6 +206,42 @@ class AmsHttpRequests(object):
         # determine the token to be used
         self.assign_token(token, cert, key)
 
+    def _build_session(self, pool_connections, pool_maxsize, pool_block,
+                       keepalive):
+        """Create requests.Session with tuned connection pool
+
+           Args:
+               pool_connections (int): Number of per host connection pools
+                                       to cache
+               pool_maxsize (int): Maximum number of connections kept in
+                                   the pool of a single host
+               pool_block (bool): Whether the pool should block waiting for
+                                  free connection instead of creating a new
+                                  one that will not be kept
+               keepalive (bool): Keep connections open between requests
+        """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections,
+                                                pool_maxsize=pool_maxsize,
+                                                pool_block=pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not keepalive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def close(self):
+        """Close the HTTP session and release all pooled connections"""
+
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def assign_token(self, token, cert, key):
         """Assign a token to the ams object
 
@@ -213,17 +310,183 @@ class AmsHttpRequests(object):
             if (response_content and sys.version_info < (3, 6,) and
                     isinstance(response_content, bytes)):
                 response_content = response_content.decode()
-            error_dict = json.loads(response_content) if response_content else {}
+            error_dict = self.json_codec.loads(response_content) if response_content else {}
         except ValueError:
             error_dict = {'error': {'code': status, 'message': response_content}}
 
         return error_dict
 
+    def _publish_body(self, msg):
+        """Serialize one or list of messages into body of publish request"""
+
+        if not isinstance(msg, list):
+            msg = [msg]
+        if all(isinstance(m, AmsMessage) for m in msg):
+            msg = [m.dict() for m in msg]
+        try:
+            return self.json_codec.dumps({"messages": msg})
+        except TypeError as e:
+            raise AmsMessageException(e)
+
+    def _publish_bodies(self, msg, max_request_bytes):
+        """Serialize one or list of messages into bodies of publish requests
+           that are not larger than max_request_bytes
+
+           Each message is serialized only once and bodies are assembled from
+           serialized messages so their size is known without serializing
+           the whole body again. Message larger than the limit is sent alone.
+
+           Yields:
+               (str, int): Body of the request and number of messages in it
+        """
+        if not isinstance(msg, list):
+            msg = [msg]
+
+        head, sep, tail = '{"messages": [', ', ', ']}'
+        envelope = len(head) + len(tail)
+
+        chunk, size = list(), envelope
+        for m in msg:
+            if isinstance(m, AmsMessage):
+                m = m.dict()
+            try:
+                encoded = self.json_codec.dumps(m)
+            except TypeError as e:
+                raise AmsMessageException(e)
+
+            # codec may serialize into bytes
+            if isinstance(encoded, bytes) and not isinstance(sep, bytes):
+                head, sep, tail = [p.encode('utf-8') for p in (head, sep, tail)]
+
+            added = len(encoded) + (len(sep) if chunk else 0)
+            if chunk and size + added > max_request_bytes:
+                yield head + sep.join(chunk) + tail, len(chunk)
+                chunk, size = list(), envelope
+                added = len(encoded)
+            chunk.append(encoded)
+            size += added
+
+        if chunk:
+            yield head + sep.join(chunk) + tail, len(chunk)
+
+    def _pull_body(self, pullopts, num, return_immediately):
+        """Serialize pull options into body of pull request"""
+
+        opts = dict(pullopts)
+        opts.update({"maxMessages": str(num),
+                     "returnImmediately": str(return_immediately).lower()})
+
+        return self.json_codec.dumps(opts)
+
+    def _ack_body(self, ids):
+        """Serialize ackIds into body of acknowledge request"""
+
+        return self.json_codec.dumps({"ackIds": ids})
+
+    def _pulled_msgs(self, msgs):
+        """Build (ackId, AmsMessage) tuples from receivedMessages of pull
+           response
+        """
+
+        return list(map(lambda m: (m['ackId'], AmsMessage(b64enc=False, **m['message'])), msgs))
+
+    def _iter_received(self, chunks):
+        """Incrementally parse receivedMessages of pull response
+
+           Elements of receivedMessages are decoded one by one with
+           JSONDecoder.raw_decode() as soon as they are read so only the
+           current element and one chunk of response are kept in memory.
+
+           Args:
+               chunks: iterable of bytes of response body
+           Yields:
+               dict: element of receivedMessages
+        """
+        decoder = json.JSONDecoder()
+        textdecoder = codecs.getincrementaldecoder('utf-8')()
+        chunks = iter(chunks)
+        buf, pos, eof = '', 0, False
+
+        def read(buf, pos, need):
+            # read at least need characters past pos, returns trimmed buffer
+            buf = buf[pos:]
+            while len(buf) < need:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return buf + textdecoder.decode(b'', final=True), True
+                buf += textdecoder.decode(chunk)
+            return buf, False
+
+        # find start of the receivedMessages array
+        while True:
+            start = buf.find('"receivedMessages"')
+            if start != -1:
+                start = buf.find('[', start)
+            if start != -1:
+                pos = start + 1
+                break
+            if eof:
+                return
+            buf, eof = read(buf, 0, len(buf) + 1)
+
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buf):
+                if eof:
+                    raise ValueError('Unterminated receivedMessages in pull response')
+                buf, eof = read(buf, pos, 1)
+                pos = 0
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                # element is not complete, read at least as much again so
+                # large elements are not re-parsed for every chunk
+                buf, eof = read(buf, pos, 2 * (len(buf) - pos))
+                pos = 0
+                continue
+            pos = end
+            yield element
+
     def _gen_backoff_time(self, try_number, backoff_factor):
         for i in range(0, try_number):
             value = backoff_factor * (2 ** (i - 1))
             yield value
 
+    def _route_retry_policy(self, route_name):
+        return self.route_retry_policies.get(route_name, self.retry_policy)
+
+    def retry_stats(self):
+        """Statistics of retries made with retry policies
+
+           Return:
+               dict: Route name mapped to number of requests, retries,
+                     requests given up because retries, elapsed time or
+                     retry budget were exhausted, total and last sleep
+        """
+        return self._retry_stats.snapshot()
+
+    def _policy_make_request(self, policy, url, body=None, route_name=None,
+                             **reqkwargs):
+        """Wrapper around _make_request() retrying as decided by policy"""
+
+        state = policy.start(route_name, self._retry_stats)
+        while True:
+            try:
+                return self._make_request(url, body, route_name, **reqkwargs)
+            except AmsException as e:
+                sleep_secs = state.next_sleep(e)
+                if sleep_secs is None:
+                    raise e
+                log.warning('Retry #{0} after {1:.2f} seconds - {2}: {3}'.format(
+                    state.attempt, sleep_secs, self.endpoint, e))
+                time.sleep(sleep_secs)
+
     def _retry_make_request(self, url, body=None, route_name=None, retry=0,
                             retrysleep=60, retrybackoff=None, **reqkwargs):
         """Wrapper around _make_request() that decides whether should request
@@ -243,6 +506,9 @@ class AmsHttpRequests(object):
            Default behaviour is no retry attempts. If both, retry and
            retrybackoff are enabled, retrybackoff will take precedence.
 
+           If retry policy is configured for the client or the route, it
+           takes precedence over retry arguments.
+
            Args:
                url: str. The final messaging service endpoint
                body: dict. Payload of the request
@@ -257,6 +523,12 @@ class AmsHttpRequests(object):
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
+        body = self._compress_body(route_name, body, reqkwargs)
+        policy = self._route_retry_policy(route_name)
+        if policy is not None:
+            return self._policy_make_request(policy, url, body, route_name,
+                                             **reqkwargs)
+
         i = 1
         timeout = reqkwargs.get('timeout', 0)
 
@@ -308,83 +580,207 @@ class AmsHttpRequests(object):
                 finally:
                     i += 1
 
+    def _set_token_header(self, route_name, reqkwargs):
+        """Populate all requests with the x-api-key header except the authn
+           mapping call
+        """
+        if route_name != "auth_x509":
+            # if there is no defined headers dict in the reqkwargs, introduce it
+            if "headers" not in reqkwargs:
+                headers = {
+                    "x-api-key": self.token
+                }
+                reqkwargs["headers"] = headers
+            else:
+                # if the there are already other headers defined, append the
+                # x-api-key one to the copy so that caller's dict shared
+                # between threads is not modified
+                headers = dict(reqkwargs["headers"])
+                headers["x-api-key"] = self.token
+                reqkwargs["headers"] = headers
+
+    @property
+    def endpoint(self):
+        return self._endpoint
+
+    @endpoint.setter
+    def endpoint(self, endpoint):
+        self._endpoint = endpoint
+        self._route_cache = OrderedDict()
+
+    @property
+    def project(self):
+        return self._project
+
+    @project.setter
+    def project(self, project):
+        self._project = project
+        self._route_cache = OrderedDict()
+
+    def _project_route(self, route_name, resource):
+        """URL of project route for resource and do_* method making its
+           request. Result is cached until endpoint or project change.
+        """
+        key = (route_name, resource)
+        cache = self._route_cache
+        compiled = cache.get(key)
+        if compiled is not None:
+            return compiled
+
+        route = self.routes[route_name]
+        compiled = (route[1].format(self.endpoint, self.project, resource),
+                    getattr(self, 'do_{0}'.format(route[0])))
+        with self._route_lock:
+            cache[key] = compiled
+            while len(cache) > self.route_cache_size:
+                cache.popitem(last=False)
+        return compiled
+
+    def _compress_body(self, route_name, body, reqkwargs):
+        """Compress request body with configured content coding. Called once
+           before request attempts, so retries send the same compressed body.
+           Content-Encoding is set on a copy of the caller's headers.
+        """
+        if not self.compression or route_name == "auth_x509":
+            return body
+
+        if (body is not None and route_name in self.compress_routes and
+                len(body) >= self.compression_threshold):
+            headers = dict(reqkwargs.get("headers") or {})
+            headers["Content-Encoding"] = self.compression
+            reqkwargs["headers"] = headers
+            body = compress(body, self.compression, self.compression_level)
+
+        return body
+
+    def _decode_response(self, content, status_code, route_name):
+        """Decode content of the AMS response or raise exception appropriate
+           for returned HTTP status code by differing between AMS and load
+           balancer erroneous behaviour.
+        """
+        decoded = None
+
+        if (content and sys.version_info < (3, 6,) and isinstance(content,
+                                                                  bytes)):
+            content = content.decode()
+
+        if status_code == 200:
+            decoded = self._error_dict(content, status_code)
+
+        # handle authnz related errors for all calls
+        elif status_code == 401 or status_code == 403:
+            raise AmsServiceException(json=self._error_dict(content,
+                                                            status_code),
+                                      request=route_name)
+
+        elif status_code == 408 or (status_code == 504 and route_name in
+                                    self.balancer_errors_route):
+            raise AmsTimeoutException(json=self._error_dict(content,
+                                                            status_code),
+                                      request=route_name)
+
+        # handle errors from AMS
+        elif (status_code != 200 and status_code in
+              self.ams_errors_route[route_name][1]):
+            raise AmsServiceException(json=self._error_dict(content,
+                                                            status_code),
+                                      request=route_name)
+
+        # handle errors coming from load balancer
+        elif (status_code != 200 and route_name in
+              self.balancer_errors_route and status_code in
+              self.balancer_errors_route[route_name][1]):
+            raise AmsBalancerException(json=self._error_dict(content,
+                                                             status_code),
+                                       request=route_name)
+
+        # handle any other erroneous behaviour by raising exception
+        else:
+            raise AmsServiceException(json=self._error_dict(content,
+                                                            status_code),
+                                      request=route_name)
+
+        return decoded if decoded else {}
+
     def _make_request(self, url, body=None, route_name=None, **reqkwargs):
         """Common method for PUT, GET, POST HTTP requests with appropriate
            service error handling by differing between AMS and load balancer
            erroneous behaviour.
+
+           If circuit breaker is set, each attempt is checked against it and
+           its outcome recorded.
+        """
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self._send_request(url, body, route_name, **reqkwargs)
+
+        breaker.before(route_name)
+        try:
+            r = self._send_request(url, body, route_name, **reqkwargs)
+        except Exception as e:
+            breaker.failure(route_name, e)
+            raise
+        except BaseException:
+            breaker.release(route_name)
+            raise
+        breaker.success(route_name)
+
+        return r
+
+    def _endpoint_url(self, url, endpoint):
+        """Direct url composed with self.endpoint to another endpoint"""
+
+        prefix = 'https://{0}/'.format(self.endpoint)
+        if url.startswith(prefix):
+            return 'https://{0}/{1}'.format(endpoint, url[len(prefix):])
+
+        return url
+
+    def _send_request(self, url, body=None, route_name=None, **reqkwargs):
+        """Send request to endpoint selected from endpoint pool. Requests of
+           failover routes that failed with connection error are sent to the
+           next endpoint.
         """
+        pool = self.endpoint_pool
+        if pool is None or route_name == "auth_x509":
+            return self._http_request(url, body, route_name, **reqkwargs)
+
+        tried = list()
+        while True:
+            endpoint = pool.acquire(exclude=tried)
+            start, failed = time.time(), False
+            try:
+                return self._http_request(self._endpoint_url(url, endpoint), body,
+                                          route_name, **reqkwargs)
+            except AmsConnectionException as e:
+                failed = True
+                tried.append(endpoint)
+                if route_name not in self.failover_routes or len(tried) >= len(pool):
+                    raise e
+                log.warning('Endpoint {0} failed, trying next one - {1}'.format(endpoint, e))
+            finally:
+                # error responses also measure latency of endpoint
+                pool.release(endpoint, latency=time.time() - start, failed=failed)
+
+    def _http_request(self, url, body=None, route_name=None, **reqkwargs):
         m = self.routes[route_name][0]
-        decoded = None
         try:
-            # the get request based on requests.
-
-            # populate all requests with the x-api-key header
-            # except the authn mapping call
-            if route_name != "auth_x509":
-                # if there is no defined headers dict in the reqkwargs, introduce it
-                if "headers" not in reqkwargs:
-                    headers = {
-                        "x-api-key": self.token
-                    }
-                    reqkwargs["headers"] = headers
-                else:
-                    # if the there are already other headers defined, just append the x-api-key one
-                    reqkwargs["headers"]["x-api-key"] = self.token
+            self._set_token_header(route_name, reqkwargs)
 
-            reqmethod = getattr(requests, m)
+            reqmethod = getattr(self.session, m)
             r = reqmethod(url, data=body, **reqkwargs)
 
-            content = r.content
-            status_code = r.status_code
-
-            if (content and sys.version_info < (3, 6,) and isinstance(content,
-                                                                      bytes)):
-                content = content.decode()
-
-            if status_code == 200:
-                decoded = self._error_dict(content, status_code)
-
-            # handle authnz related errors for all calls
-            elif status_code == 401 or status_code == 403:
-                raise AmsServiceException(json=self._error_dict(content,
-                                                                status_code),
-                                          request=route_name)
-
-            elif status_code == 408 or (status_code == 504 and route_name in
-                                        self.balancer_errors_route):
-                raise AmsTimeoutException(json=self._error_dict(content,
-                                                                status_code),
-                                          request=route_name)
-
-            # handle errors from AMS
-            elif (status_code != 200 and status_code in
-                  self.ams_errors_route[route_name][1]):
-                raise AmsServiceException(json=self._error_dict(content,
-                                                                status_code),
-                                          request=route_name)
-
-            # handle errors coming from load balancer
-            elif (status_code != 200 and route_name in
-                  self.balancer_errors_route and status_code in
-                  self.balancer_errors_route[route_name][1]):
-                raise AmsBalancerException(json=self._error_dict(content,
-                                                                 status_code),
-                                           request=route_name)
-
-            # handle any other erroneous behaviour by raising exception
-            else:
-                raise AmsServiceException(json=self._error_dict(content,
-                                                                status_code),
-                                          request=route_name)
+            # successful streamed response is read incrementally by caller
+            if reqkwargs.get('stream') and r.status_code == 200:
+                return r
+
+            return self._decode_response(r.content, r.status_code, route_name)
 
         except (requests.exceptions.ConnectionError,
                 requests.exceptions.ReadTimeout,
                 socket.error) as e:
             raise AmsConnectionException(e, route_name)
 
-        else:
-            return decoded if decoded else {}
-
     def do_get(self, url, route_name, **reqkwargs):
         """Method supports all the GET requests.
 
@@ -482,31 +878,215 @@ class ArgoMessagingService(AmsHttpRequests):
 
        Class abstract Argo Messaging Service by covering all available HTTP API
        calls that are wrapped in series of methods.
+
+       All requests are made through one requests.Session so TCP and TLS
+       connections to the AMS endpoint are kept alive and reused. Session
+       can be passed explicitly or it will be created with HTTPAdapter
+       configured by pool_connections, pool_maxsize, pool_block and
+       keepalive arguments.
+
+       Request bodies are serialized and responses decoded with json_codec,
+       which is either name of the codec (json, orjson, ujson or auto for
+       the fastest installed one) or object with dumps() and loads()
+       methods. Default is json module from standard library.
+
+       With compression set to gzip or deflate, publish bodies of at least
+       compression_threshold bytes are sent compressed with
+       compression_level and Content-Encoding header. Service (or proxy
+       in front of it) must accept compressed request bodies. Compressed
+       responses are negotiated and decoded by the HTTP library regardless
+       of this setting.
+
+       retry_policy (AmsRetryPolicy) replaces retry arguments of calls with
+       jittered backoff, limit of elapsed time and retry budget.
+       route_retry_policies maps route names to policies overriding it.
+       Decisions are counted in retry_stats().
+
+       circuit_breaker (AmsCircuitBreaker) makes calls of route that
+       repeatedly failed raise AmsCircuitOpenException without making
+       request until the route recovers.
+
+       endpoint can be list of AMS endpoints. Requests are then balanced
+       between healthy ones by endpoint_strategy (least_outstanding or
+       ewma) and endpoint failing with connection error is not used for
+       endpoint_cooldown seconds. Requests of idempotent routes
+       (failover_routes) are immediately sent to the next endpoint.
+
+       With metadata_ttl, has_topic(), has_sub() and get_topic() and
+       get_sub() with retobj=True are answered from topic and subscription
+       objects fetched less than metadata_ttl seconds ago. Cached metadata
+       can be dropped with invalidate_topic()/invalidate_sub() or fetched
+       again with refresh_topic()/refresh_sub().
+
+       With registry_size, containers of topic and subscription objects
+       (topics and subs) are AmsRegistry objects keeping at most
+       registry_size least recently used objects each, so memory of
+       long-running client walking many resources stays bounded.
+
+       Object is safe for concurrent use from multiple threads, e.g. from a
+       thread pool consuming several subscriptions. Per call options (like
+       pull options) are not stored on the object and containers of topic
+       and subscription objects are guarded with a lock, so one object with
+       its connection pool can be shared instead of creating one per thread.
     """
 
-    def __init__(self, endpoint, token="", project="", cert="", key="", authn_port=8443):
-        super(ArgoMessagingService, self).__init__(endpoint, authn_port, token, cert, key)
+    def __init__(self, endpoint, token="", project="", cert="", key="",
+                 authn_port=8443, session=None, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, keepalive=True,
+                 json_codec=None, compression=None, compression_level=6,
+                 compression_threshold=1024, retry_policy=None,
+                 route_retry_policies=None, circuit_breaker=None,
+                 endpoint_strategy='least_outstanding', endpoint_cooldown=30,
+                 metadata_ttl=None, registry_size=None):
+        super(ArgoMessagingService, self).__init__(endpoint, authn_port, token,
+                                                   cert, key, session=session,
+                                                   pool_connections=pool_connections,
+                                                   pool_maxsize=pool_maxsize,
+                                                   pool_block=pool_block,
+                                                   keepalive=keepalive,
+                                                   json_codec=json_codec,
+                                                   compression=compression,
+                                                   compression_level=compression_level,
+                                                   compression_threshold=compression_threshold,
+                                                   retry_policy=retry_policy,
+                                                   route_retry_policies=route_retry_policies,
+                                                   circuit_breaker=circuit_breaker,
+                                                   endpoint_strategy=endpoint_strategy,
+                                                   endpoint_cooldown=endpoint_cooldown)
         self.project = project
         self.pullopts = {"maxMessages": "1",
                          "returnImmediately": "false"}
         # Containers for topic and subscription objects
-        self.topics = OrderedDict()
-        self.subs = OrderedDict()
+        if registry_size is None:
+            self.topics = OrderedDict()
+            self.subs = OrderedDict()
+        else:
+            self.topics = AmsRegistry(registry_size)
+            self.subs = AmsRegistry(registry_size)
+        # guards the containers when client is shared between threads
+        self._lock = threading.RLock()
+        # seconds topic and subscription objects answer get_*(retobj=True)
+        # and has_* without request to the service
+        self.metadata_ttl = metadata_ttl
 
     def _create_sub_obj(self, s, topic):
-        self.subs.update({s['name']: AmsSubscription(s['name'], topic,
-                                                     s['pushConfig'],
-                                                     s['ackDeadlineSeconds'],
-                                                     init=self)})
+        with self._lock:
+            obj = self.subs.get(s['name'])
+            if obj is None:
+                obj = AmsSubscription(s['name'], topic, s['pushConfig'],
+                                      s['ackDeadlineSeconds'], init=self)
+                self.subs[s['name']] = obj
+            return obj
 
     def _delete_sub_obj(self, s):
-        del self.subs[s['name']]
+        with self._lock:
+            self.subs.pop(s['name'], None)
 
     def _create_topic_obj(self, t):
-        self.topics.update({t['name']: AmsTopic(t['name'], init=self)})
+        with self._lock:
+            obj = self.topics.get(t['name'])
+            if obj is None:
+                obj = AmsTopic(t['name'], init=self)
+                self.topics[t['name']] = obj
+            return obj
 
     def _delete_topic_obj(self, t):
-        del self.topics[t['name']]
+        with self._lock:
+            self.topics.pop(t['name'], None)
+
+    def registry_stats(self):
+        """Hit, miss and eviction counters of bounded topic and subscription
+           registries
+
+           Return:
+               dict: topics and subs mapped to AmsRegistry.stats(), empty
+                     if client was created without registry_size
+        """
+        if not isinstance(self.topics, AmsRegistry):
+            return dict()
+
+        return {'topics': self.topics.stats(), 'subs': self.subs.stats()}
+
+    def _fresh(self, objs, fullname):
+        if not self.metadata_ttl:
+            return None
+        obj = objs.get(fullname)
+        if obj is not None and time.time() - obj.fetched < self.metadata_ttl:
+            return obj
+
+        return None
+
+    def _cached_topic(self, topic):
+        """AmsTopic object fetched less than metadata_ttl seconds ago"""
+
+        return self._fresh(self.topics, '/projects/{0}/topics/{1}'.format(self.project, topic))
+
+    def _cached_sub(self, sub):
+        """AmsSubscription object fetched less than metadata_ttl seconds ago"""
+
+        return self._fresh(self.subs, '/projects/{0}/subscriptions/{1}'.format(self.project, sub))
+
+    def _invalidate(self, objs, fullname):
+        with self._lock:
+            if fullname is None and isinstance(objs, AmsRegistry):
+                # evicted objects still in use are returned on lookup too
+                targets = objs.alive_values()
+            elif fullname is None:
+                targets = list(objs.values())
+            else:
+                targets = [objs[fullname]] if fullname in objs else []
+            for obj in targets:
+                obj.fetched = 0
+
+    def invalidate_topic(self, topic=None):
+        """Mark cached metadata of topic stale so it is fetched from service
+           on the next get_topic()/has_topic()
+
+           Kwargs:
+               topic (str): Topic name, all topics if not given
+        """
+        self._invalidate(self.topics, topic and '/projects/{0}/topics/{1}'.format(self.project, topic))
+
+    def invalidate_sub(self, sub=None):
+        """Mark cached metadata of subscription stale so it is fetched from
+           service on the next get_sub()/has_sub()
+
+           Kwargs:
+               sub (str): Subscription name, all subscriptions if not given
+        """
+        self._invalidate(self.subs, sub and '/projects/{0}/subscriptions/{1}'.format(self.project, sub))
+
+    def refresh_topic(self, topic, **reqkwargs):
+        """Fetch metadata of topic from service and update its cached
+           AmsTopic object
+
+           Args:
+               topic (str): Topic name
+           Kwargs:
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Return:
+               object (AmsTopic)
+        """
+        self.invalidate_topic(topic)
+
+        return self.get_topic(topic, retobj=True, **reqkwargs)
+
+    def refresh_sub(self, sub, **reqkwargs):
+        """Fetch metadata of subscription from service and update its
+           cached AmsSubscription object
+
+           Args:
+               sub (str): Subscription name
+           Kwargs:
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Return:
+               object (AmsSubscription)
+        """
+        self.invalidate_sub(sub)
+
+        return self.get_sub(sub, retobj=True, **reqkwargs)
 
     def getacl_topic(self, topic, **reqkwargs):
         """Get access control lists for topic
@@ -529,13 +1109,13 @@ class ArgoMessagingService(AmsHttpRequests):
         r = method(url, "topic_getacl", **reqkwargs)
 
         if r:
-            self.topics[topicobj.fullname].acls = r['authorized_users']
+            topicobj.acls = r['authorized_users']
             return r
         else:
-            self.topics[topicobj.fullname].acls = []
+            topicobj.acls = []
             return []
 
-    def modifyacl_topic(self, topic, users, **reqkwargs):
+    def modifyacl_topic(self, topic, users, verify=True, **reqkwargs):
         """Modify access control lists for topic
 
            Args:
@@ -544,11 +1124,16 @@ class ArgoMessagingService(AmsHttpRequests):
                              Empty list of users will reset access control list.
 
            Kwargs:
+               verify (bool): Fetch topic before the modification, raising
+                              AmsServiceException early if it doesn't exist
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
 
-        topicobj = self.get_topic(topic, retobj=True, **reqkwargs)
+        if verify:
+            topicobj = self.get_topic(topic, retobj=True, **reqkwargs)
+        else:
+            topicobj = self.topics.get('/projects/{0}/topics/{1}'.format(self.project, topic))
 
         route = self.routes["topic_modifyacl"]
         # Compose url
@@ -557,11 +1142,11 @@ class ArgoMessagingService(AmsHttpRequests):
 
         r = None
         try:
-            msg_body = json.dumps({"authorized_users": users})
+            msg_body = self.json_codec.dumps({"authorized_users": users})
             r = method(url, msg_body, "topic_modifyacl", **reqkwargs)
 
-            if r is not None:
-                self.topics[topicobj.fullname].acls = users
+            if r is not None and topicobj is not None:
+                topicobj.acls = users
 
             return True
 
@@ -589,10 +1174,10 @@ class ArgoMessagingService(AmsHttpRequests):
         r = method(url, "sub_getacl", **reqkwargs)
 
         if r:
-            self.subs[subobj.fullname].acls = r['authorized_users']
+            subobj.acls = r['authorized_users']
             return r
         else:
-            self.subs[subobj.fullname].acls = []
+            subobj.acls = []
             return []
 
     def getoffsets_sub(self, sub, offset='all', **reqkwargs):
@@ -674,12 +1259,12 @@ class ArgoMessagingService(AmsHttpRequests):
         # Request body
         data = {"offset": move_to}
         try:
-            r = method(url, json.dumps(data), "sub_mod_offset", **reqkwargs)
+            r = method(url, self.json_codec.dumps(data), "sub_mod_offset", **reqkwargs)
             return r
         except AmsServiceException as e:
             raise e
 
-    def modifyacl_sub(self, sub, users, **reqkwargs):
+    def modifyacl_sub(self, sub, users, verify=True, **reqkwargs):
         """Modify access control lists for subscription
 
            Args:
@@ -687,11 +1272,17 @@ class ArgoMessagingService(AmsHttpRequests):
                users (list): List of users that will have access to subscription.
                              Empty list of users will reset access control list.
            Kwargs:
+               verify (bool): Fetch subscription before the modification,
+                              raising AmsServiceException early if it doesn't
+                              exist
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
 
-        subobj = self.get_sub(sub, retobj=True, **reqkwargs)
+        if verify:
+            subobj = self.get_sub(sub, retobj=True, **reqkwargs)
+        else:
+            subobj = self.subs.get('/projects/{0}/subscriptions/{1}'.format(self.project, sub))
 
         route = self.routes["sub_modifyacl"]
         # Compose url
@@ -700,11 +1291,11 @@ class ArgoMessagingService(AmsHttpRequests):
 
         r = None
         try:
-            msg_body = json.dumps({"authorized_users": users})
+            msg_body = self.json_codec.dumps({"authorized_users": users})
             r = method(url, msg_body, "sub_modifyacl", **reqkwargs)
 
-            if r is not None:
-                self.subs[subobj.fullname].acls = users
+            if r is not None and subobj is not None:
+                subobj.acls = users
 
             return True
 
@@ -728,7 +1319,7 @@ class ArgoMessagingService(AmsHttpRequests):
         else:
             push_dict = {"pushConfig": {}}
 
-        msg_body = json.dumps(push_dict)
+        msg_body = self.json_codec.dumps(push_dict)
         route = self.routes["sub_pushconfig"]
         # Compose url
         url = route[1].format(self.endpoint, self.project, sub)
@@ -743,55 +1334,86 @@ class ArgoMessagingService(AmsHttpRequests):
 
         return p
 
-    def iter_subs(self, topic=None, **reqkwargs):
+    def iter_subs(self, topic=None, page_size=0, **reqkwargs):
         """Iterate over AmsSubscription objects
 
+           Subscriptions are listed page by page following nextPageToken
+           and objects are yielded as each page arrives.
+
            Args:
                topic: Iterate over subscriptions only associated to this topic name
+               page_size: int. Number of subscriptions requested per page,
+                          service default if 0
         """
-        self.list_subs(**reqkwargs)
+        page_token = ""
+        while True:
+            r = self._list_page("sub_list", page_size, page_token, **reqkwargs)
+            for s in r.get('subscriptions', []):
+                subobj = self._register_sub(s)
+                if not topic or topic == subobj.topic.name:
+                    yield subobj
+
+            page_token = r.get('nextPageToken')
+            if not page_token:
+                break
 
-        try:
-            values = self.subs.copy().itervalues()
-        except AttributeError:
-            values = self.subs.copy().values()
+    def iter_topics(self, page_size=0, **reqkwargs):
+        """Iterate over AmsTopic objects
+
+           Topics are listed page by page following nextPageToken and
+           objects are yielded as each page arrives.
+
+           Args:
+               page_size: int. Number of topics requested per page, service
+                          default if 0
+        """
+        page_token = ""
+        while True:
+            r = self._list_page("topic_list", page_size, page_token, **reqkwargs)
+            for t in r.get('topics', []):
+                yield self._create_topic_obj(t)
 
-        for s in values:
-            if topic and topic == s.topic.name:
-                yield s
-            elif not topic:
-                yield s
+            page_token = r.get('nextPageToken')
+            if not page_token:
+                break
 
-    def iter_topics(self, **reqkwargs):
-        """Iterate over AmsTopic objects"""
+    def _list_page(self, route_name, page_size, page_token, **reqkwargs):
+        """GET one page of topic or subscription list"""
 
-        self.list_topics(**reqkwargs)
+        route = self.routes[route_name]
+        # Compose url
+        url = route[1].format(self.endpoint, self.project)
+        method = getattr(self, 'do_{0}'.format(route[0]))
 
-        try:
-            values = self.topics.copy().itervalues()
-        except AttributeError:
-            values = self.topics.copy().values()
+        if page_size or page_token:
+            params = dict(reqkwargs.get('params') or {})
+            if page_size:
+                params['pageSize'] = page_size
+            if page_token:
+                params['pageToken'] = page_token
+            reqkwargs['params'] = params
 
-        for t in values:
-            yield t
+        return method(url, route_name, **reqkwargs)
 
-    def list_topics(self, **reqkwargs):
+    def _register_sub(self, s):
+        topic = self._create_topic_obj({'name': s['topic']})
+
+        return self._create_sub_obj(s, topic.fullname)
+
+    def list_topics(self, page_size=0, page_token="", **reqkwargs):
         """List the topics of a selected project
 
            Args:
+               page_size: int. Number of topics per page, all topics if
+                          page_size and page_token are not given
+               page_token: str. nextPageToken of the previous page
                reqkwargs: keyword argument that will be passed to underlying
                python-requests library call
         """
-        route = self.routes["topic_list"]
-        # Compose url
-        url = route[1].format(self.endpoint, self.project)
-        method = getattr(self, 'do_{0}'.format(route[0]))
-
-        r = method(url, "topic_list", **reqkwargs)
+        r = self._list_page("topic_list", page_size, page_token, **reqkwargs)
 
         for t in r['topics']:
-            if t['name'] not in self.topics:
-                self._create_topic_obj(t)
+            self._create_topic_obj(t)
 
         if r:
             return r
@@ -804,6 +1426,9 @@ class ArgoMessagingService(AmsHttpRequests):
            Args:
                topic: str. Topic name
         """
+        if self._cached_topic(topic) is not None:
+            return True
+
         try:
             self.get_topic(topic, **reqkwargs)
             return True
@@ -826,6 +1451,11 @@ class ArgoMessagingService(AmsHttpRequests):
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
+        if retobj:
+            cached = self._cached_topic(topic)
+            if cached is not None:
+                return cached
+
         route = self.routes["topic_get"]
         # Compose url
         url = route[1].format(self.endpoint, self.project, topic)
@@ -833,21 +1463,33 @@ class ArgoMessagingService(AmsHttpRequests):
 
         r = method(url, "topic_get", **reqkwargs)
 
-        if r['name'] not in self.topics:
-            self._create_topic_obj(r)
+        with self._lock:
+            obj = self.topics.get(r['name'])
+            if obj is None:
+                obj = self._create_topic_obj(r)
+            else:
+                obj.fetched = time.time()
 
         if retobj:
-            return self.topics[r['name']]
+            return obj
         else:
             return r
 
-    def publish(self, topic, msg, retry=0, retrysleep=60, retrybackoff=None, **reqkwargs):
+    def publish(self, topic, msg, retry=0, retrysleep=60, retrybackoff=None,
+                max_request_bytes=None, **reqkwargs):
         """Publish a message or list of messages to a selected topic.
 
            If enabled (retry > 0), multiple topic publishes will be tried in
            case of problems/glitches with the AMS service. retry* options are
            eventually passed to _retry_make_request()
 
+           If max_request_bytes is set, list of messages is split into
+           several publish requests, each not larger than max_request_bytes,
+           so that AMS does not reject the whole list with HTTP 413. Requests
+           are made in order and messageIds of all of them are merged in the
+           order of messages. If one of the requests fails, messages from
+           previous requests are already published.
+
            Args:
                topic (str): Topic name.
                msg (list): A list with one or more messages to send.
@@ -861,48 +1503,47 @@ class ArgoMessagingService(AmsHttpRequests):
                            request attempt
                retrybackoff: int. Backoff factor to apply between each request
                              attempts
+               max_request_bytes: int. Maximum size of single publish
+                                  request in bytes
                reqkwargs: keyword argument that will be passed to underlying
                        python-requests library call.
            Return:
                dict: Dictionary with messageIds of published messages
         """
-        if not isinstance(msg, list):
-            msg = [msg]
-        if all(isinstance(m, AmsMessage) for m in msg):
-            msg = [m.dict() for m in msg]
-        try:
-            msg_body = json.dumps({"messages": msg})
-        except TypeError as e:
-            raise AmsMessageException(e)
-
-        route = self.routes["topic_publish"]
         # Compose url
-        url = route[1].format(self.endpoint, self.project, topic)
-        method = getattr(self, 'do_{0}'.format(route[0]))
+        url, method = self._project_route("topic_publish", topic)
+
+        if not max_request_bytes:
+            msg_body = self._publish_body(msg)
+
+            return method(url, msg_body, "topic_publish", retry=retry,
+                          retrysleep=retrysleep, retrybackoff=retrybackoff,
+                          **reqkwargs)
 
-        return method(url, msg_body, "topic_publish", retry=retry,
-                      retrysleep=retrysleep, retrybackoff=retrybackoff,
-                      **reqkwargs)
+        msgids = list()
+        for msg_body, _ in self._publish_bodies(msg, max_request_bytes):
+            r = method(url, msg_body, "topic_publish", retry=retry,
+                       retrysleep=retrysleep, retrybackoff=retrybackoff,
+                       **reqkwargs)
+            msgids.extend(r['messageIds'])
 
-    def list_subs(self, **reqkwargs):
+        return {"messageIds": msgids}
+
+    def list_subs(self, page_size=0, page_token="", **reqkwargs):
         """Lists all subscriptions in a project with a GET request.
 
            Args:
+               page_size: int. Number of subscriptions per page, all
+                          subscriptions if page_size and page_token are not
+                          given
+               page_token: str. nextPageToken of the previous page
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
-        route = self.routes["sub_list"]
-        # Compose url
-        url = route[1].format(self.endpoint, self.project)
-        method = getattr(self, 'do_{0}'.format(route[0]))
-
-        r = method(url, "sub_list", **reqkwargs)
+        r = self._list_page("sub_list", page_size, page_token, **reqkwargs)
 
         for s in r['subscriptions']:
-            if s['topic'] not in self.topics:
-                self._create_topic_obj({'name': s['topic']})
-            if s['name'] not in self.subs:
-                self._create_sub_obj(s, self.topics[s['topic']].fullname)
+            self._register_sub(s)
 
         if r:
             return r
@@ -918,6 +1559,11 @@ class ArgoMessagingService(AmsHttpRequests):
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
+        if retobj:
+            cached = self._cached_sub(sub)
+            if cached is not None:
+                return cached
+
         route = self.routes["sub_get"]
         # Compose url
         url = route[1].format(self.endpoint, self.project, sub)
@@ -925,13 +1571,15 @@ class ArgoMessagingService(AmsHttpRequests):
 
         r = method(url, "sub_get", **reqkwargs)
 
-        if r['topic'] not in self.topics:
-            self._create_topic_obj({'name': r['topic']})
-        if r['name'] not in self.subs:
-            self._create_sub_obj(r, self.topics[r['topic']].fullname)
+        with self._lock:
+            obj = self.subs.get(r['name'])
+            if obj is None:
+                obj = self._register_sub(r)
+            else:
+                obj._load_metadata(r['pushConfig'], r['ackDeadlineSeconds'])
 
         if retobj:
-            return self.subs[r['name']]
+            return obj
         else:
             return r
 
@@ -941,6 +1589,9 @@ class ArgoMessagingService(AmsHttpRequests):
            Args:
                sub: str. The subscription name.
         """
+        if self._cached_sub(sub) is not None:
+            return True
+
         try:
             self.get_sub(sub, **reqkwargs)
             return True
@@ -955,7 +1606,8 @@ class ArgoMessagingService(AmsHttpRequests):
             raise e
 
     def pull_sub(self, sub, num=1, return_immediately=False, retry=0,
-                 retrysleep=60, retrybackoff=None, **reqkwargs):
+                 retrysleep=60, retrybackoff=None, as_batch=False,
+                 **reqkwargs):
         """This function consumes messages from a subscription in a project
            with a POST request.
 
@@ -966,30 +1618,75 @@ class ArgoMessagingService(AmsHttpRequests):
            Args:
                sub: str. The subscription name.
                num: int. The number of messages to pull.
+               as_batch: bool. Return messages as AmsMessageBatch instead of
+                         list of (ackId, AmsMessage) tuples.
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
         """
 
-        wasmax = self.get_pullopt('maxMessages')
-        wasretim = self.get_pullopt('returnImmediately')
+        # pull options of this call are serialized on their own copy so
+        # concurrent pulls don't see each other's maxMessages
+        msg_body = self._pull_body(self.pullopts, num, return_immediately)
 
-        self.set_pullopt('maxMessages', num)
-        self.set_pullopt('returnImmediately', str(return_immediately).lower())
-        msg_body = json.dumps(self.pullopts)
-
-        route = self.routes["sub_pull"]
         # Compose url
-        url = route[1].format(self.endpoint, self.project, sub)
-        method = getattr(self, 'do_{0}'.format(route[0]))
+        url, method = self._project_route("sub_pull", sub)
         r = method(url, msg_body, "sub_pull", retry=retry,
                    retrysleep=retrysleep, retrybackoff=retrybackoff,
                    **reqkwargs)
         msgs = r['receivedMessages']
 
-        self.set_pullopt('maxMessages', wasmax)
-        self.set_pullopt('returnImmediately', wasretim)
+        if as_batch:
+            return AmsMessageBatch(msgs)
 
-        return list(map(lambda m: (m['ackId'], AmsMessage(b64enc=False, **m['message'])), msgs))
+        return self._pulled_msgs(msgs)
+
+    def iter_pull_sub(self, sub, num=1, return_immediately=False, retry=0,
+                      retrysleep=60, retrybackoff=None, chunk_size=65536,
+                      **reqkwargs):
+        """Consume messages from a subscription with streamed response.
+
+           Unlike pull_sub(), response is not read and decoded at once, but
+           is read in chunks and each message is yielded as soon as it is
+           parsed, so memory used stays bounded regardless of the number of
+           pulled messages. Request is made and retried when method is
+           called, errors while reading the response are raised from the
+           iteration. Response is parsed with json module from standard
+           library regardless of json_codec.
+
+           Args:
+               sub: str. The subscription name.
+               num: int. The number of messages to pull.
+               chunk_size: int. Number of bytes read from response at once.
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Return:
+               iterator: (ackId, AmsMessage) tuples
+        """
+        msg_body = self._pull_body(self.pullopts, num, return_immediately)
+
+        # Compose url
+        url, method = self._project_route("sub_pull", sub)
+        reqkwargs['stream'] = True
+        r = method(url, msg_body, "sub_pull", retry=retry,
+                   retrysleep=retrysleep, retrybackoff=retrybackoff,
+                   **reqkwargs)
+
+        return self._iter_pulled_response(r, chunk_size)
+
+    def _iter_pulled_response(self, r, chunk_size):
+        try:
+            for m in self._iter_received(r.iter_content(chunk_size)):
+                yield (m['ackId'], AmsMessage(b64enc=False, **m['message']))
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ReadTimeout,
+                socket.error) as e:
+            raise AmsConnectionException(e, "sub_pull")
+        except ValueError as e:
+            raise AmsServiceException(json={'error': {'code': 500, 'message': str(e)}},
+                                      request="sub_pull")
+        finally:
+            r.close()
 
     def ack_sub(self, sub, ids, **reqkwargs):
         """Acknownledgment of received messages
@@ -1006,12 +1703,10 @@ class ArgoMessagingService(AmsHttpRequests):
               reqkwargs: keyword argument that will be passed to underlying python-requests library call.
         """
 
-        msg_body = json.dumps({"ackIds": ids})
+        msg_body = self._ack_body(ids)
 
-        route = self.routes["sub_ack"]
         # Compose url
-        url = route[1].format(self.endpoint, self.project, sub)
-        method = getattr(self, 'do_{0}'.format(route[0]))
+        url, method = self._project_route("sub_ack", sub)
         method(url, msg_body, "sub_ack", **reqkwargs)
 
         return True
@@ -1066,6 +1761,69 @@ class ArgoMessagingService(AmsHttpRequests):
 
         return messages
 
+    def iter_pullack_sub(self, sub, num=1, return_immediately=False, retry=0,
+                         retrysleep=60, retrybackoff=None, **reqkwargs):
+        """Pipelined pull and acknowledgement of messages from subscription.
+
+           Generator yields acknowledged batches like repeated pullack_sub()
+           calls, but acknowledgement of batch N is sent concurrently with
+           the pull of batch N+1 so each cycle costs one round-trip instead
+           of two. Batch is yielded only after its acknowledgement succeeded.
+           Pull is served from the last acknowledged offset, so overlapping
+           pull asks for the messages being acknowledged plus num and the
+           ones already part of the previous batch (pull reached the service
+           before acknowledgement) are dropped.
+
+           If acknowledgement fails, concurrently pulled batch is discarded
+           without acknowledging it and consume cycle starts from beginning
+           with new subscription pull, the same as in pullack_sub(), so ack
+           deadline time window is moved to new start period.
+
+           Args:
+               sub: str. The subscription name.
+               num: int. The number of messages to pull.
+               return_immediately: bool. If True, generator ends when pull
+                                   returns no messages.
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Yields:
+               [AmsMessage1, AmsMessage2]: List of acknowledged AmsMessage
+                                           instances
+        """
+        def pull(count=num):
+            while True:
+                msgs = self.pull_sub(sub, count,
+                                     return_immediately=return_immediately,
+                                     retry=retry, retrysleep=retrysleep,
+                                     retrybackoff=retrybackoff, **reqkwargs)
+                if msgs or return_immediately:
+                    return msgs
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            current = pull()
+            while current:
+                ack = executor.submit(self.ack_sub, sub,
+                                      [id for id, _ in current], **reqkwargs)
+                try:
+                    nextmsgs = pull(len(current) + num)
+                finally:
+                    ackexp = ack.exception()
+
+                if ackexp is not None:
+                    if not isinstance(ackexp, AmsException):
+                        raise ackexp
+                    log.warning('Continuing with sub_pull after sub_ack: {0}'.format(ackexp))
+                    current = pull()
+                    continue
+
+                yield [msg for _, msg in current]
+
+                nextmsgs = unseen_messages(nextmsgs, current)[:num]
+                current = nextmsgs if nextmsgs else pull()
+        finally:
+            executor.shutdown(wait=True)
+
     def set_pullopt(self, key, value):
         """Function for setting pull options
 
@@ -1173,7 +1931,7 @@ class ArgoMessagingService(AmsHttpRequests):
             route = self.routes["user_update"]
             url = route[1].format(self.endpoint, name)
             method = getattr(self, 'do_{0}'.format(route[0]))
-            r = method(url, json.dumps(body), "user_update", **reqkwargs)
+            r = method(url, self.json_codec.dumps(body), "user_update", **reqkwargs)
             return AmsUser().load_from_dict(r)
         except AmsException as e:
             raise e
@@ -1259,16 +2017,7 @@ class ArgoMessagingService(AmsHttpRequests):
         :return: (AmsUserPage) a page containing AmsUser objects and pagination details
         """
         try:
-            url_params = {
-                "details": details,
-                "pageSize": page_size,
-                "nextPageToken": next_page_token
-            }
-            route = self.routes["users_list"]
-            url = route[1].format(self.endpoint)
-            method = getattr(self, 'do_{0}'.format(route[0]))
-            reqkwargs["params"] = url_params
-            r = method(url, "users_list", **reqkwargs)
+            r = self._list_users_raw(details, page_size, next_page_token, **reqkwargs)
             return AmsUserPage(
                 users=[AmsUser().load_from_dict(x) for x in r["users"]],
                 total_size=r["totalSize"],
@@ -1277,6 +2026,52 @@ class ArgoMessagingService(AmsHttpRequests):
         except AmsException as e:
             raise e
 
+    def _list_users_raw(self, details, page_size, next_page_token, **reqkwargs):
+        """GET one page of users as dict returned by the service"""
+
+        url_params = {
+            "details": details,
+            "pageSize": page_size,
+            "nextPageToken": next_page_token
+        }
+        route = self.routes["users_list"]
+        url = route[1].format(self.endpoint)
+        method = getattr(self, 'do_{0}'.format(route[0]))
+        reqkwargs["params"] = url_params
+        return method(url, "users_list", **reqkwargs)
+
+    def iter_users(self, page_size=0, details=True, lazy=False, **reqkwargs):
+        """
+        Iterates over all users following the next page tokens. The next page is
+        requested in the background while the current one is consumed, and only
+        the pages in progress are held in memory.
+        :param page_size: (int) size of each page, service default if 0
+        :param details: (bool) whether to include project details per user
+        :param lazy: (bool) yield AmsUserRecord objects that build the AmsUser only when accessed
+        :param reqkwargs:  keyword arguments that will be passed to underlying
+               python-requests library call.
+        :return: (generator) AmsUser or AmsUserRecord objects
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        page = executor.submit(self._list_users_raw, details, page_size, "", **reqkwargs)
+        try:
+            while page is not None:
+                r = page.result()
+                next_page_token = r.get("nextPageToken")
+                page = None
+                if next_page_token:
+                    page = executor.submit(self._list_users_raw, details, page_size,
+                                           next_page_token, **reqkwargs)
+
+                users = r.get("users", [])
+                del r
+                for x in users:
+                    yield AmsUserRecord(x) if lazy else AmsUser().load_from_dict(x)
+        finally:
+            if page is not None:
+                page.cancel()
+            executor.shutdown(wait=False)
+
     def delete_user(self, name, **reqkwargs):
         """
         Deletes the respective user using the provided username with a DELETE request
@@ -1338,7 +2133,7 @@ class ArgoMessagingService(AmsHttpRequests):
             route = self.routes["project_add_member"]
             url = route[1].format(self.endpoint, project, username)
             method = getattr(self, 'do_{0}'.format(route[0]))
-            r = method(url, json.dumps(body), "project_add_member", **reqkwargs)
+            r = method(url, self.json_codec.dumps(body), "project_add_member", **reqkwargs)
             return AmsUser().load_from_dict(r)
         except AmsException as e:
             raise e
@@ -1437,7 +2232,7 @@ class ArgoMessagingService(AmsHttpRequests):
             route = self.routes["project_create"]
             url = route[1].format(self.endpoint, name)
             method = getattr(self, 'do_{0}'.format(route[0]))
-            r = method(url, json.dumps(body), "project_create", **reqkwargs)
+            r = method(url, self.json_codec.dumps(body), "project_create", **reqkwargs)
             return r
         except AmsException as e:
             raise e
@@ -1463,7 +2258,7 @@ class ArgoMessagingService(AmsHttpRequests):
             route = self.routes["project_update"]
             url = route[1].format(self.endpoint, name)
             method = getattr(self, 'do_{0}'.format(route[0]))
-            r = method(url, json.dumps(body), "project_update", **reqkwargs)
+            r = method(url, self.json_codec.dumps(body), "project_update", **reqkwargs)
             return r
         except AmsException as e:
             raise e
@@ -1503,7 +2298,8 @@ class ArgoMessagingService(AmsHttpRequests):
             raise e
 
     def create_sub(self, sub, topic, ackdeadline=10, push_endpoint=None,
-                   retry_policy_type='linear', retry_policy_period=300, retobj=False, **reqkwargs):
+                   retry_policy_type='linear', retry_policy_period=300, retobj=False,
+                   verify=True, **reqkwargs):
         """This function creates a new subscription in a project with a PUT request
 
            Args:
@@ -1519,12 +2315,17 @@ class ArgoMessagingService(AmsHttpRequests):
                retry_policy_type:
                retry_policy_period:
                retobj: Controls whether method should return AmsSubscription object
+               verify: Fetch topic before creating subscription, otherwise
+                       topic is only checked by the service
                reqkwargs: keyword argument that will be passed to underlying
                python-requests library call.
         """
-        topic = self.get_topic(topic, retobj=True, **reqkwargs)
+        if verify:
+            topic_fullname = self.get_topic(topic, retobj=True, **reqkwargs).fullname
+        else:
+            topic_fullname = '/projects/{0}/topics/{1}'.format(self.project, topic)
 
-        msg_body = json.dumps({"topic": topic.fullname.strip('/'),
+        msg_body = self.json_codec.dumps({"topic": topic_fullname.strip('/'),
                                "ackDeadlineSeconds": ackdeadline})
 
         route = self.routes["sub_create"]
@@ -1540,11 +2341,10 @@ class ArgoMessagingService(AmsHttpRequests):
                                "retryPolicy": {"type": retry_policy_type,
                                                "period": retry_policy_period}}
 
-        if r['name'] not in self.subs:
-            self._create_sub_obj(r, topic.fullname)
+        subobj = self._register_sub(dict(r, topic=topic_fullname))
 
         if retobj:
-            return self.subs[r['name']]
+            return subobj
         else:
             return r
 
@@ -1564,8 +2364,7 @@ class ArgoMessagingService(AmsHttpRequests):
         r = method(url, "sub_delete", **reqkwargs)
 
         sub_fullname = "/projects/{0}/subscriptions/{1}".format(self.project, sub)
-        if sub_fullname in self.subs:
-            self._delete_sub_obj({'name': sub_fullname})
+        self._delete_sub_obj({'name': sub_fullname})
 
         return r
 
@@ -1609,11 +2408,10 @@ class ArgoMessagingService(AmsHttpRequests):
 
         r = method(url, '', "topic_create", **reqkwargs)
 
-        if r['name'] not in self.topics:
-            self._create_topic_obj(r)
+        obj = self._create_topic_obj(r)
 
         if retobj:
-            return self.topics[r['name']]
+            return obj
         else:
             return r
 
@@ -1633,11 +2431,58 @@ class ArgoMessagingService(AmsHttpRequests):
         r = method(url, "topic_delete", **reqkwargs)
 
         topic_fullname = "/projects/{0}/topics/{1}".format(self.project, topic)
-        if topic_fullname in self.topics:
-            self._delete_topic_obj({'name': topic_fullname})
+        self._delete_topic_obj({'name': topic_fullname})
 
         return r
 
+    def bulk(self, operations, workers=8, verify=False):
+        """Run many admin operations concurrently
+
+           Operations are run on a pool of workers sharing the client
+           connection pool, so workers should not exceed pool_maxsize.
+           Operations of one call don't wait for each other, dependent ones
+           (e.g. creating topic and its subscriptions) should be passed in
+           separate calls.
+
+           Args:
+               operations (list): Operations as (name, args) or
+                                  (name, args, kwargs) tuples, where name is
+                                  one of BULK_OPERATIONS methods, e.g.
+                                  ('create_sub', ('sub1', 'topic1'))
+           Kwargs:
+               workers (int): Maximum number of operations run at once
+               verify (bool): Fetch topic or subscription before
+                              create_sub() and modifyacl_*() as they do when
+                              called directly
+           Return:
+               list: AmsBulkResult for each operation in input order
+        """
+        operations = list(operations)
+        calls = list()
+        for operation in operations:
+            name, args, kwargs = parse_operation(operation)
+            if name in VERIFIED_OPERATIONS:
+                kwargs.setdefault('verify', verify)
+            calls.append((getattr(self, name), args, kwargs))
+
+        def run(operation, call):
+            method, args, kwargs = call
+            try:
+                return AmsBulkResult(operation, result=method(*args, **kwargs))
+            except Exception as e:
+                return AmsBulkResult(operation, error=e)
+
+        if not calls:
+            return []
+
+        executor = ThreadPoolExecutor(max_workers=min(workers, len(calls)))
+        try:
+            futures = [executor.submit(run, operation, call)
+                       for operation, call in zip(operations, calls)]
+            return [f.result() for f in futures]
+        finally:
+            executor.shutdown(wait=True)
+
     def status(self, **reqkwargs):
         """
         Retrieves the status of the service
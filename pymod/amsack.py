@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+
+from .amsexceptions import AmsException
+
+log = logging.getLogger(__name__)
+
+
+def ackid_offset(ackid):
+    """Extract message offset from ackId (projects/P/subscriptions/S:offset)
+
+       Return:
+           int: offset or None if ackId is not in expected format
+    """
+    try:
+        return int(ackid.rsplit(':', 1)[1])
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+def unseen_messages(msgs, prev):
+    """Drop messages of msgs that were already pulled in prev
+
+       Pull starts from the last acknowledged offset, so messages that are
+       not acknowledged yet are returned again. Messages are compared by
+       ackId offset or by messageId if ackIds carry no offset.
+
+       Args:
+           msgs (list): (ackId, AmsMessage) tuples of the latest pull
+           prev (list): (ackId, AmsMessage) tuples of the previous pull
+       Return:
+           list: (ackId, AmsMessage) tuples not pulled before
+    """
+    offsets = [ackid_offset(id) for id, _ in prev]
+    if None in offsets:
+        seen = set(msg.get_msgid() for _, msg in prev)
+        return [(id, msg) for id, msg in msgs if msg.get_msgid() not in seen]
+    highest = max(offsets)
+    return [(id, msg) for id, msg in msgs
+            if ackid_offset(id) is None or ackid_offset(id) > highest]
+
+
+class AmsAckManager(object):
+    """Deferred and coalesced acknowledgement of pulled messages
+
+       AMS considers message with the highest offset and all previous ones
+       acknowledged, so only the ackId with the highest offset from the
+       collected ones is sent. Acknowledgement is sent from background thread
+       when max_pending ackIds are collected or when interval seconds passed
+       since the first of them was collected, so acks are kept off the
+       processing thread.
+
+       ackdeadline runs from the pull of messages, so ack is also sent at
+       the latest half of the ackdeadline after the collected messages were
+       pulled. Pull time is passed to ack() with pulled_at or recorded with
+       pulled(), which AmsSubscription.stream() does when given the
+       manager. Without it, pull time is taken to be the time of ack().
+
+       Args:
+           sub (AmsSubscription): Subscription whose messages are acknowledged
+       Kwargs:
+           max_pending (int): Number of collected ackIds that triggers ack
+           interval (float): Maximum number of seconds collected ackId waits
+                             before ack is sent. Defaults to half of the
+                             ackdeadline.
+           reqkwargs: keyword argument that will be passed to underlying
+                      python-requests library call.
+    """
+
+    def __init__(self, sub, max_pending=100, interval=None, **reqkwargs):
+        self.sub = sub
+        self.max_pending = max_pending
+        self.maxinterval = float(sub.ackdeadline) / 2
+        if interval is None or interval > self.maxinterval:
+            interval = self.maxinterval
+        self.interval = interval
+        self.reqkwargs = reqkwargs
+
+        # number of sent acknowledgements and acknowledged ackIds
+        self.acks_sent = 0
+        self.ids_acked = 0
+        self.last_error = None
+
+        self._cond = threading.Condition()
+        self._highest = None
+        self._highest_offset = -1
+        self._pending = 0
+        self._due = None
+        # highest offset and time of pulled batches not acknowledged yet
+        self._pulls = list()
+        self._inflight = False
+        self._flushing = False
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run,
+                                        name='AmsAckManager-{0}'.format(sub.name))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def pulled(self, ids, pulled_at=None):
+        """Record pull time of messages so their ack is sent before
+           ackdeadline counted from the pull expires
+
+           Args:
+               ids (list): ackIds of pulled messages
+           Kwargs:
+               pulled_at (float): Time of the pull, now if not given
+        """
+        offsets = [o for o in (ackid_offset(id) for id in ids) if o is not None]
+        if not offsets:
+            return
+
+        with self._cond:
+            self._pulls.append((max(offsets), pulled_at or time.time()))
+
+    def _pull_time(self, offset, default):
+        if offset is not None:
+            for highest, pulled_at in self._pulls:
+                if offset <= highest:
+                    return pulled_at
+
+        return default
+
+    def ack(self, ids, pulled_at=None):
+        """Collect ackIds of processed messages
+
+           Args:
+               ids (str, list): One or list of ackIds
+           Kwargs:
+               pulled_at (float): Time messages were pulled, if not recorded
+                                  with pulled()
+        """
+        if not isinstance(ids, list):
+            ids = [ids]
+
+        with self._cond:
+            if self._closed:
+                raise AmsException('Acknowledgement manager for subscription {0} '
+                                   'is closed'.format(self.sub.name))
+            now = time.time()
+            earliest = now
+            for ackid in ids:
+                offset = ackid_offset(ackid)
+                # ackIds without offset are considered the latest ones
+                if offset is None or offset >= self._highest_offset:
+                    self._highest = ackid
+                    self._highest_offset = offset if offset is not None else self._highest_offset
+                earliest = min(earliest, pulled_at or self._pull_time(offset, now))
+            due = min(now + self.interval, earliest + self.maxinterval)
+            if not self._pending or due < self._due:
+                self._due = due
+            self._pending += len(ids)
+            self._cond.notify_all()
+
+    def flush(self, wait=True):
+        """Send acknowledgement for collected ackIds
+
+           Kwargs:
+               wait (boolean): Wait until acknowledgement is sent
+           Return:
+               bool: True if there were collected ackIds or acknowledgement
+                     in progress
+        """
+        with self._cond:
+            if not self._pending and not self._inflight:
+                return False
+            if not wait:
+                self._due = time.time()
+                self._cond.notify_all()
+                return True
+            self._flushing = True
+            self._cond.notify_all()
+            while self._pending or self._inflight:
+                self._cond.wait()
+            self._flushing = False
+            return True
+
+    def close(self):
+        """Send acknowledgement for collected ackIds and stop background
+           thread
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        if self._closed or self._flushing or self._pending >= self.max_pending:
+            return True
+
+        return time.time() >= self._due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closed and not self._pending:
+                        return
+                    if self._pending:
+                        self._cond.wait(max(self._due - time.time(), 0))
+                    else:
+                        self._cond.wait()
+                ackid, count = self._highest, self._pending
+                self._pending = 0
+                self._inflight = True
+                self._pulls = [p for p in self._pulls if p[0] > self._highest_offset]
+
+            try:
+                self.sub.init.ack_sub(self.sub.name, [ackid], **self.reqkwargs)
+                self.acks_sent += 1
+                self.ids_acked += count
+            except Exception as e:
+                # unacknowledged messages will be redelivered by AMS
+                self.last_error = e
+                log.warning('Acknowledgement of {0} messages up to {1} failed: {2}'.format(
+                    count, ackid, e))
+            finally:
+                with self._cond:
+                    self._inflight = False
+                    self._cond.notify_all()
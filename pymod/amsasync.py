@@ -0,0 +1,498 @@
+import asyncio
+import functools
+import logging
+import socket
+import time
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .ams import AmsHttpRequests
+from .amsexceptions import (AmsException, AmsConnectionException,
+                            AmsTimeoutException, AmsBalancerException)
+from .amsmsg import AmsMessageBatch
+from .amsregistry import AmsRegistry
+from .amssubscription import AmsSubscription
+from .amstopic import AmsTopic
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class AmsAsyncTransport(object):
+    """Interface of HTTP transport used by AsyncArgoMessagingService
+
+       Transport executes single HTTP request and returns tuple with HTTP
+       status code and content of the response. Problems in the lower
+       network layers are reported with AmsConnectionException.
+    """
+
+    async def request(self, method, url, route_name, body=None, **reqkwargs):
+        """Make HTTP request
+
+           Args:
+               method (str): HTTP method (get, put, post, delete)
+               url (str): The final messaging service endpoint
+               route_name (str): The name of the route
+           Kwargs:
+               body (str): Payload of the request
+               reqkwargs: keyword arguments in python-requests style (headers,
+                          params, timeout, verify, cert)
+           Return:
+               (int, bytes): HTTP status code and content of the response
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Release connections held by transport"""
+        pass
+
+
+class AmsAiohttpTransport(AmsAsyncTransport):
+    """Transport running on aiohttp connection pool
+
+       All requests share one aiohttp.ClientSession so thousands of in-flight
+       requests can be served by one event loop over pooled connections.
+
+       Kwargs:
+           limit (int): Total number of simultaneous connections
+           limit_per_host (int): Number of simultaneous connections to the
+                                 same endpoint. 0 means no limit.
+    """
+
+    def __init__(self, limit=100, limit_per_host=0):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for AmsAiohttpTransport')
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    async def request(self, method, url, route_name, body=None, **reqkwargs):
+        kwargs = dict()
+        if reqkwargs.get('headers'):
+            kwargs['headers'] = reqkwargs['headers']
+        if reqkwargs.get('params'):
+            kwargs['params'] = dict((k, str(v)) for k, v in reqkwargs['params'].items())
+        timeout = reqkwargs.get('timeout')
+        if isinstance(timeout, tuple):
+            kwargs['timeout'] = aiohttp.ClientTimeout(sock_connect=timeout[0],
+                                                      sock_read=timeout[1])
+        elif timeout:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        if reqkwargs.get('verify') is False:
+            kwargs['ssl'] = False
+
+        try:
+            async with self._get_session().request(method.upper(), url,
+                                                   data=body, **kwargs) as r:
+                content = await r.read()
+                return r.status, content
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, socket.error) as e:
+            raise AmsConnectionException(e, route_name)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AmsThreadTransport(AmsAsyncTransport):
+    """Transport running blocking requests.Session calls in executor
+
+       Used when aiohttp is not available. Concurrency is bound by the number
+       of workers of the executor.
+
+       Args:
+           session (requests.Session): Session with pooled connections
+       Kwargs:
+           executor (concurrent.futures.Executor): Executor running requests.
+                                                   Default executor of the
+                                                   event loop is used if
+                                                   omitted.
+    """
+
+    def __init__(self, session, executor=None):
+        self.session = session
+        self.executor = executor
+
+    async def request(self, method, url, route_name, body=None, **reqkwargs):
+        loop = asyncio.get_event_loop()
+        reqmethod = functools.partial(getattr(self.session, method), url,
+                                      data=body, **reqkwargs)
+        try:
+            r = await loop.run_in_executor(self.executor, reqmethod)
+            return r.status_code, r.content
+
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ReadTimeout,
+                socket.error) as e:
+            raise AmsConnectionException(e, route_name)
+
+
+class AsyncArgoMessagingService(AmsHttpRequests):
+    """Asyncio counterpart of ArgoMessagingService
+
+       Class covers topic publish, subscription pull and acknowledgement
+       calls with awaitable methods. It shares the routes and error handling
+       with ArgoMessagingService and raises the same exceptions. Requests are
+       made over pluggable AmsAsyncTransport; AmsAiohttpTransport is used by
+       default if aiohttp is installed, otherwise blocking requests are run
+       in executor with AmsThreadTransport.
+
+       Authentication with certificate is done synchronously when object is
+       created.
+    """
+
+    def __init__(self, endpoint, token="", project="", cert="", key="",
+                 authn_port=8443, transport=None, registry_size=None,
+                 **sessionkwargs):
+        super(AsyncArgoMessagingService, self).__init__(endpoint, authn_port,
+                                                        token, cert, key,
+                                                        **sessionkwargs)
+        self.project = project
+        self.pullopts = {"maxMessages": "1",
+                         "returnImmediately": "false"}
+        # Containers for topic and subscription objects
+        if registry_size is None:
+            self.topics = OrderedDict()
+            self.subs = OrderedDict()
+        else:
+            self.topics = AmsRegistry(registry_size)
+            self.subs = AmsRegistry(registry_size)
+
+        if transport is None:
+            if aiohttp is not None:
+                transport = AmsAiohttpTransport()
+            else:
+                transport = AmsThreadTransport(self.session)
+        self.transport = transport
+
+    async def close(self):
+        """Close transport and HTTP session"""
+
+        await self.transport.close()
+        super(AsyncArgoMessagingService, self).close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _make_request_async(self, url, body=None, route_name=None,
+                                  **reqkwargs):
+        """Awaitable counterpart of AmsHttpRequests._make_request()"""
+
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before(route_name)
+        try:
+            r = await self._send_request_async(url, body, route_name, **reqkwargs)
+        except Exception as e:
+            if breaker is not None:
+                breaker.failure(route_name, e)
+            raise
+        except BaseException:
+            # cancelled request gives its probe back
+            if breaker is not None:
+                breaker.release(route_name)
+            raise
+        if breaker is not None:
+            breaker.success(route_name)
+
+        return r
+
+    async def _send_request_async(self, url, body=None, route_name=None,
+                                  **reqkwargs):
+        """Awaitable counterpart of AmsHttpRequests._send_request()"""
+
+        pool = self.endpoint_pool
+        if pool is None or route_name == "auth_x509":
+            return await self._http_request_async(url, body, route_name, **reqkwargs)
+
+        tried = list()
+        while True:
+            endpoint = pool.acquire(exclude=tried)
+            start, failed = time.time(), False
+            try:
+                return await self._http_request_async(self._endpoint_url(url, endpoint),
+                                                      body, route_name, **reqkwargs)
+            except AmsConnectionException as e:
+                failed = True
+                tried.append(endpoint)
+                if route_name not in self.failover_routes or len(tried) >= len(pool):
+                    raise e
+                log.warning('Endpoint {0} failed, trying next one - {1}'.format(endpoint, e))
+            finally:
+                pool.release(endpoint, latency=time.time() - start, failed=failed)
+
+    async def _http_request_async(self, url, body=None, route_name=None,
+                                  **reqkwargs):
+        self._set_token_header(route_name, reqkwargs)
+        status_code, content = await self.transport.request(self.routes[route_name][0],
+                                                            url, route_name,
+                                                            body=body,
+                                                            **reqkwargs)
+
+        return self._decode_response(content, status_code, route_name)
+
+    async def _retry_make_request_async(self, url, body=None, route_name=None,
+                                        retry=0, retrysleep=60,
+                                        retrybackoff=None, **reqkwargs):
+        """Awaitable counterpart of AmsHttpRequests._retry_make_request()
+
+           Static sleep and backoff retry modes behave the same, but waiting
+           between attempts does not block the event loop. Configured retry
+           policy takes precedence over retry arguments.
+        """
+        body = self._compress_body(route_name, body, reqkwargs)
+        policy = self._route_retry_policy(route_name)
+        if policy is not None:
+            state = policy.start(route_name, self._retry_stats)
+            while True:
+                try:
+                    return await self._make_request_async(url, body, route_name,
+                                                          **reqkwargs)
+                except AmsException as e:
+                    sleep_secs = state.next_sleep(e)
+                    if sleep_secs is None:
+                        raise e
+                    log.warning('Retry #{0} after {1:.2f} seconds - {2}: {3}'.format(
+                        state.attempt, sleep_secs, self.endpoint, e))
+                    await asyncio.sleep(sleep_secs)
+
+        if retrybackoff:
+            sleeps = list(self._gen_backoff_time(retry, retrybackoff))
+        else:
+            sleeps = [retrysleep] * retry
+
+        i = 1
+        while True:
+            try:
+                return await self._make_request_async(url, body, route_name,
+                                                      **reqkwargs)
+            except (AmsBalancerException, AmsConnectionException,
+                    AmsTimeoutException) as e:
+                if i > len(sleeps):
+                    raise e
+                sleep_secs = sleeps[i - 1]
+                await asyncio.sleep(sleep_secs)
+                log.warning('Retry #{0} after {1} seconds - {2}: {3}'.format(
+                    i, sleep_secs, self.endpoint, e))
+                i += 1
+
+    def _create_sub_obj(self, s, topic):
+        obj = self.subs.get(s['name'])
+        if obj is None:
+            obj = AmsSubscription(s['name'], topic, s['pushConfig'],
+                                  s['ackDeadlineSeconds'], init=self)
+            self.subs[s['name']] = obj
+        return obj
+
+    def _create_topic_obj(self, t):
+        obj = self.topics.get(t['name'])
+        if obj is None:
+            obj = AmsTopic(t['name'], init=self)
+            self.topics[t['name']] = obj
+        return obj
+
+    async def get_topic(self, topic, retobj=False, **reqkwargs):
+        """Get the details of a selected topic.
+
+           Args:
+               topic: str. Topic name.
+               retobj: Controls whether method should return AmsTopic object
+               reqkwargs: keyword argument that will be passed to underlying
+                          transport.
+        """
+        route = self.routes["topic_get"]
+        # Compose url
+        url = route[1].format(self.endpoint, self.project, topic)
+
+        r = await self._retry_make_request_async(url, route_name="topic_get",
+                                                 **reqkwargs)
+
+        obj = self._create_topic_obj(r)
+
+        if retobj:
+            return obj
+        else:
+            return r
+
+    async def get_sub(self, sub, retobj=False, **reqkwargs):
+        """Get the details of a subscription.
+
+           Args:
+               sub: str. The subscription name.
+               retobj: Controls whether method should return AmsSubscription object
+               reqkwargs: keyword argument that will be passed to underlying
+                          transport.
+        """
+        route = self.routes["sub_get"]
+        # Compose url
+        url = route[1].format(self.endpoint, self.project, sub)
+
+        r = await self._retry_make_request_async(url, route_name="sub_get",
+                                                 **reqkwargs)
+
+        topic = self._create_topic_obj({'name': r['topic']})
+        obj = self._create_sub_obj(r, topic.fullname)
+
+        if retobj:
+            return obj
+        else:
+            return r
+
+    async def publish(self, topic, msg, retry=0, retrysleep=60,
+                      retrybackoff=None, max_request_bytes=None, **reqkwargs):
+        """Publish a message or list of messages to a selected topic.
+
+           Args:
+               topic (str): Topic name.
+               msg (list): A list with one or more messages to send.
+                           Each message is represented as AmsMessage object or python
+                           dictionary with at least data or one attribute key defined.
+           Kwargs:
+               retry: int. Number of request retries before giving up.
+               retrysleep: int. Static number of seconds to sleep before next
+                           request attempt
+               retrybackoff: int. Backoff factor to apply between each request
+                             attempts
+               max_request_bytes: int. Split list of messages into several
+                                  publish requests not larger than this
+               reqkwargs: keyword argument that will be passed to underlying
+                          transport.
+           Return:
+               dict: Dictionary with messageIds of published messages
+        """
+        # Compose url
+        url = self._project_route("topic_publish", topic)[0]
+
+        if not max_request_bytes:
+            msg_body = self._publish_body(msg)
+
+            return await self._retry_make_request_async(url, msg_body,
+                                                        "topic_publish",
+                                                        retry=retry,
+                                                        retrysleep=retrysleep,
+                                                        retrybackoff=retrybackoff,
+                                                        **reqkwargs)
+
+        msgids = list()
+        for msg_body, _ in self._publish_bodies(msg, max_request_bytes):
+            r = await self._retry_make_request_async(url, msg_body,
+                                                     "topic_publish",
+                                                     retry=retry,
+                                                     retrysleep=retrysleep,
+                                                     retrybackoff=retrybackoff,
+                                                     **reqkwargs)
+            msgids.extend(r['messageIds'])
+
+        return {"messageIds": msgids}
+
+    async def pull_sub(self, sub, num=1, return_immediately=False, retry=0,
+                       retrysleep=60, retrybackoff=None, as_batch=False,
+                       **reqkwargs):
+        """Consume messages from a subscription.
+
+           Args:
+               sub: str. The subscription name.
+               num: int. The number of messages to pull.
+               as_batch: bool. Return messages as AmsMessageBatch instead of
+                         list of (ackId, AmsMessage) tuples.
+               reqkwargs: keyword argument that will be passed to underlying
+                          transport.
+           Return:
+               [(ackId, AmsMessage)]: List of tuples with ackId and AmsMessage
+                                      instance or AmsMessageBatch
+        """
+        msg_body = self._pull_body(self.pullopts, num, return_immediately)
+
+        # Compose url
+        url = self._project_route("sub_pull", sub)[0]
+
+        r = await self._retry_make_request_async(url, msg_body, "sub_pull",
+                                                 retry=retry,
+                                                 retrysleep=retrysleep,
+                                                 retrybackoff=retrybackoff,
+                                                 **reqkwargs)
+
+        if as_batch:
+            return AmsMessageBatch(r['receivedMessages'])
+
+        return self._pulled_msgs(r['receivedMessages'])
+
+    async def ack_sub(self, sub, ids, **reqkwargs):
+        """Acknownledgment of received messages
+
+           Args:
+              sub: str. The subscription name.
+              ids: list(str). A list of ids of the messages to acknowledge.
+              reqkwargs: keyword argument that will be passed to underlying
+                         transport.
+        """
+        msg_body = self._ack_body(ids)
+
+        # Compose url
+        url = self._project_route("sub_ack", sub)[0]
+        await self._retry_make_request_async(url, msg_body, "sub_ack",
+                                             **reqkwargs)
+
+        return True
+
+    async def pullack_sub(self, sub, num=1, return_immediately=False, retry=0,
+                          retrysleep=60, retrybackoff=None, **reqkwargs):
+        """Pull messages from subscription and acknownledge them in one call.
+
+           Failed acknowledgement resets the consume cycle that starts again
+           with new subscription pull, same as in
+           ArgoMessagingService.pullack_sub().
+
+           Args:
+               sub: str. The subscription name.
+               num: int. The number of messages to pull.
+               reqkwargs: keyword argument that will be passed to underlying
+                          transport.
+           Return:
+               [AmsMessage1, AmsMessage2]: List of AmsMessage instances
+        """
+        while True:
+            ackIds = list()
+            messages = list()
+
+            for id, msg in await self.pull_sub(sub, num,
+                                               return_immediately=return_immediately,
+                                               retry=retry,
+                                               retrysleep=retrysleep,
+                                               retrybackoff=retrybackoff,
+                                               **reqkwargs):
+                ackIds.append(id)
+                messages.append(msg)
+
+            if messages and ackIds:
+                try:
+                    await self.ack_sub(sub, ackIds, **reqkwargs)
+                    break
+                except AmsException as e:
+                    log.warning('Continuing with sub_pull after sub_ack: {0}'.format(e))
+            else:
+                break
+
+        return messages
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+
+from .amsexceptions import AmsCircuitOpenException
+from .amsretry import RETRIABLE_EXCEPTIONS
+
+log = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class AmsCircuitBreaker(object):
+    """Circuit breaker keeping requests away from failing AMS routes
+
+       Breaker is kept for each route separately. After failure_threshold
+       consecutive requests of the route failed with balancer, timeout or
+       connection errors, breaker opens and requests of the route fail
+       immediately with AmsCircuitOpenException, without waiting for
+       timeouts and retries. After reset_timeout seconds breaker is
+       half-open and lets half_open_max requests through as probes. Success
+       of probe closes the breaker, failure opens it again. Any other
+       response, including AMS errors like 404, means that service responds
+       and resets the count of failures.
+
+       Kwargs:
+           failure_threshold (int): Consecutive failures opening breaker
+           reset_timeout (float): Seconds breaker stays open
+           half_open_max (int): Concurrent probe requests of half-open
+                                breaker
+           trip_on (tuple): Exceptions counted as failures
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, half_open_max=1,
+                 trip_on=RETRIABLE_EXCEPTIONS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.trip_on = trip_on
+        self._lock = threading.Lock()
+        self._routes = dict()
+
+    def _route(self, route_name):
+        route = self._routes.get(route_name)
+        if route is None:
+            route = {'state': CLOSED, 'failures': 0, 'opened': 0, 'probes': 0}
+            self._routes[route_name] = route
+
+        return route
+
+    def before(self, route_name):
+        """Check whether request of route can be made
+
+           Raises:
+               AmsCircuitOpenException: breaker of route is open
+        """
+        with self._lock:
+            route = self._route(route_name)
+            if route['state'] == CLOSED:
+                return
+
+            remaining = route['opened'] + self.reset_timeout - time.time()
+            if route['state'] == OPEN and remaining <= 0:
+                route['state'] = HALF_OPEN
+                route['probes'] = 0
+            if route['state'] == HALF_OPEN and route['probes'] < self.half_open_max:
+                route['probes'] += 1
+                return
+
+        raise AmsCircuitOpenException(route_name, max(remaining, 0))
+
+    def success(self, route_name):
+        """Record successful request of route"""
+
+        with self._lock:
+            route = self._route(route_name)
+            if route['state'] != CLOSED:
+                log.info('Circuit breaker of {0} closed'.format(route_name))
+            route.update(state=CLOSED, failures=0, probes=0)
+
+    def failure(self, route_name, exp):
+        """Record request of route that failed with exception exp"""
+
+        if not isinstance(exp, self.trip_on):
+            return self.success(route_name)
+
+        with self._lock:
+            route = self._route(route_name)
+            route['failures'] += 1
+            if (route['state'] == HALF_OPEN or
+                    (route['state'] == CLOSED and
+                     route['failures'] >= self.failure_threshold)):
+                log.warning('Circuit breaker of {0} opened after {1} failures: {2}'.format(
+                    route_name, route['failures'], exp))
+                route.update(state=OPEN, opened=time.time(), probes=0)
+
+    def release(self, route_name):
+        """Record request of route that was interrupted without outcome"""
+
+        with self._lock:
+            route = self._route(route_name)
+            if route['state'] == HALF_OPEN and route['probes']:
+                route['probes'] -= 1
+
+    def state(self, route_name):
+        """State of the breaker of route: closed, open or half-open"""
+
+        with self._lock:
+            route = self._route(route_name)
+            if (route['state'] == OPEN and
+                    time.time() - route['opened'] >= self.reset_timeout):
+                return HALF_OPEN
+
+            return route['state']
+
+    def states(self):
+        """States and consecutive failures of all routes
+
+           Return:
+               dict: Route name mapped to (state, failures)
+        """
+        return dict((name, (self.state(name), self._routes[name]['failures']))
+                    for name in list(self._routes))
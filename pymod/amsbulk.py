@@ -0,0 +1,57 @@
+# methods of ArgoMessagingService that can be run with bulk()
+BULK_OPERATIONS = ('create_topic', 'delete_topic', 'create_sub', 'delete_sub',
+                   'modifyacl_topic', 'modifyacl_sub', 'pushconfig_sub',
+                   'create_user', 'update_user', 'delete_user',
+                   'add_project_member', 'remove_project_member')
+
+# operations that fetch the resource before the request unless verify=False
+VERIFIED_OPERATIONS = ('create_sub', 'modifyacl_topic', 'modifyacl_sub')
+
+
+class AmsBulkResult(object):
+    """Outcome of one operation run with ArgoMessagingService.bulk()
+
+       Args:
+           operation (tuple): Operation as passed to bulk()
+           result: Return value of the operation, None if it failed
+           error (Exception): Exception the operation raised, None if it
+                              succeeded
+    """
+    __slots__ = ('operation', 'result', 'error')
+
+    def __init__(self, operation, result=None, error=None):
+        self.operation = operation
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return 'AmsBulkResult({0!r}, result={1!r})'.format(self.operation, self.result)
+
+        return 'AmsBulkResult({0!r}, error={1!r})'.format(self.operation, self.error)
+
+
+def parse_operation(operation):
+    """Split operation into method name, positional and keyword arguments
+
+       Args:
+           operation (tuple): (name, args) or (name, args, kwargs)
+       Return:
+           tuple: name, args, kwargs
+    """
+    if not isinstance(operation, (tuple, list)) or not 2 <= len(operation) <= 3:
+        raise ValueError('Operation has to be (name, args) or (name, args, kwargs), '
+                         'got {0!r}'.format(operation))
+
+    name, args = operation[0], operation[1]
+    kwargs = dict(operation[2]) if len(operation) == 3 and operation[2] else dict()
+    if name not in BULK_OPERATIONS:
+        raise ValueError('Unsupported bulk operation {0}'.format(name))
+    if not isinstance(args, (tuple, list)):
+        args = (args,)
+
+    return name, tuple(args), kwargs
@@ -0,0 +1,80 @@
+import zlib
+
+from .amsexceptions import AmsException, AmsMessageException
+
+# Content-Encoding values supported for request bodies
+CONTENT_ENCODINGS = ('gzip', 'deflate')
+
+
+def compress(data, encoding, level=6):
+    """Compress data with HTTP content coding
+
+       Args:
+           data (str, bytes): Data to compress, str is encoded as UTF-8
+           encoding (str): gzip or deflate (zlib format as defined by HTTP)
+       Kwargs:
+           level (int): Compression level from 1 (fastest) to 9 (smallest)
+       Return:
+           bytes: compressed data
+    """
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+
+    if encoding == 'gzip':
+        # gzip.compress() is not available on Python 2
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    elif encoding == 'deflate':
+        return zlib.compress(data, level)
+
+    raise AmsException('Unsupported content encoding {0}'.format(encoding))
+
+
+def _zstd_codec():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    return (lambda data: zstandard.ZstdCompressor().compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+def _lzma_codec():
+    try:
+        import lzma
+    except ImportError:
+        return None
+
+    return (lzma.compress, lzma.decompress)
+
+
+# codecs of message payloads as (compress, decompress) functions, None if
+# the module implementing codec is not installed
+PAYLOAD_CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': _lzma_codec(),
+    'zstd': _zstd_codec(),
+}
+
+
+def _payload_codec(codec):
+    functions = PAYLOAD_CODECS.get(codec)
+    if functions is None:
+        if codec in PAYLOAD_CODECS:
+            raise AmsMessageException('Module for payload codec {0} is not installed'.format(codec))
+        raise AmsMessageException('Unsupported payload codec {0}'.format(codec))
+
+    return functions
+
+
+def compress_payload(data, codec):
+    """Compress message payload with codec (zlib, lzma or zstd)"""
+
+    return _payload_codec(codec)[0](data)
+
+
+def decompress_payload(data, codec):
+    """Decompress message payload compressed with codec"""
+
+    return _payload_codec(codec)[1](data)
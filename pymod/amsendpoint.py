@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+
+LEAST_OUTSTANDING = 'least_outstanding'
+EWMA = 'ewma'
+
+
+class AmsEndpointPool(object):
+    """Pool of AMS endpoints requests are balanced between
+
+       Each request is sent to one of the healthy endpoints, either the one
+       with the least requests in progress (least_outstanding) or the one
+       with the lowest exponentially weighted moving average of response
+       latency (ewma). Endpoint that failed with connection error is marked
+       down for cooldown seconds. If all endpoints are down, the one that
+       will recover first is used.
+
+       Args:
+           endpoints (list): Host names (with optional port) of endpoints
+       Kwargs:
+           strategy (str): least_outstanding or ewma
+           cooldown (float): Seconds failed endpoint is not used
+           alpha (float): Weight of the latest latency in the moving average
+    """
+
+    def __init__(self, endpoints, strategy=LEAST_OUTSTANDING, cooldown=30,
+                 alpha=0.3):
+        if not endpoints:
+            raise ValueError('At least one endpoint is needed')
+        if strategy not in (LEAST_OUTSTANDING, EWMA):
+            raise ValueError('Unknown endpoint strategy {0}'.format(strategy))
+        self.endpoints = list(endpoints)
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._state = dict((e, {'outstanding': 0, 'latency': None,
+                                'down_until': 0, 'requests': 0,
+                                'failures': 0})
+                           for e in self.endpoints)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def _key(self, endpoint):
+        state = self._state[endpoint]
+        if self.strategy == EWMA:
+            # endpoints without measurement are tried first
+            return (state['latency'] or 0, state['outstanding'])
+
+        return (state['outstanding'], state['latency'] or 0)
+
+    def acquire(self, exclude=()):
+        """Select endpoint for request and count it as outstanding
+
+           Kwargs:
+               exclude (list): Endpoints that should not be selected
+           Return:
+               str: endpoint
+        """
+        with self._lock:
+            now = time.time()
+            candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+            healthy = [e for e in candidates if self._state[e]['down_until'] <= now]
+            if healthy:
+                best = min(self._key(e) for e in healthy)
+                endpoint = random.choice([e for e in healthy if self._key(e) == best])
+            else:
+                endpoint = min(candidates, key=lambda e: self._state[e]['down_until'])
+
+            state = self._state[endpoint]
+            state['outstanding'] += 1
+            state['requests'] += 1
+
+            return endpoint
+
+    def release(self, endpoint, latency=None, failed=False):
+        """Record finished request to endpoint
+
+           Args:
+               endpoint (str): Endpoint returned by acquire()
+           Kwargs:
+               latency (float): Seconds request took
+               failed (bool): Request failed with connection error, endpoint
+                              is marked down
+        """
+        with self._lock:
+            state = self._state[endpoint]
+            state['outstanding'] -= 1
+            if failed:
+                state['failures'] += 1
+                state['down_until'] = time.time() + self.cooldown
+            else:
+                state['down_until'] = 0
+                if latency is not None:
+                    if state['latency'] is None:
+                        state['latency'] = latency
+                    else:
+                        state['latency'] += self.alpha * (latency - state['latency'])
+
+    def stats(self):
+        """Copy of state of endpoints
+
+           Return:
+               dict: Endpoint mapped to dict with requests in progress,
+                     latency average, number of requests and failures and
+                     whether it is down
+        """
+        with self._lock:
+            now = time.time()
+            return dict((e, {'outstanding': s['outstanding'],
+                             'latency': s['latency'],
+                             'requests': s['requests'],
+                             'failures': s['failures'],
+                             'down': s['down_until'] > now})
+                        for e, s in self._state.items())
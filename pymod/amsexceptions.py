@@ -60,3 +60,15 @@ class AmsMessageException(AmsException):
     def __init__(self, msg):
         self.msg = msg
         super(AmsMessageException, self).__init__(self.msg)
+
+
+class AmsCircuitOpenException(AmsException):
+    """Exception raised without making request while circuit breaker of the
+       route is open after consecutive failures
+    """
+
+    def __init__(self, request, retry_after):
+        self.retry_after = retry_after
+        self.msg = "While trying the [{0}]: circuit breaker is open, next attempt in {1:.1f} seconds".format(
+            request, retry_after)
+        super(AmsCircuitOpenException, self).__init__(self.msg)
@@ -0,0 +1,92 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class AmsJsonCodec(object):
+    """JSON codec used for bodies of requests and responses
+
+       Default implementation uses json module from standard library. Codec
+       can be replaced by any object with dumps() returning str or bytes and
+       loads() accepting str or bytes and raising ValueError for malformed
+       input.
+    """
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def loads(self, s):
+        return json.loads(s)
+
+
+class AmsOrjsonCodec(AmsJsonCodec):
+    """JSON codec backed by orjson. Serialized bodies are bytes."""
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is not installed')
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, s):
+        return orjson.loads(s)
+
+
+class AmsUjsonCodec(AmsJsonCodec):
+    """JSON codec backed by ujson"""
+    name = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError('ujson is not installed')
+
+    def dumps(self, obj):
+        return ujson.dumps(obj)
+
+    def loads(self, s):
+        return ujson.loads(s)
+
+
+_codecs = {'json': AmsJsonCodec,
+           'orjson': AmsOrjsonCodec,
+           'ujson': AmsUjsonCodec}
+
+
+def get_json_codec(codec='json'):
+    """Resolve JSON codec
+
+       Args:
+           codec (str, object): Name of the codec (json, orjson, ujson or
+                                auto picking the fastest installed one) or
+                                codec object that is returned as is
+       Return:
+           object: codec with dumps() and loads() methods
+    """
+    if codec is None:
+        codec = 'json'
+    if not isinstance(codec, str):
+        return codec
+
+    if codec == 'auto':
+        for name in ['orjson', 'ujson']:
+            try:
+                return _codecs[name]()
+            except ImportError:
+                pass
+        return AmsJsonCodec()
+
+    try:
+        return _codecs[codec]()
+    except KeyError:
+        raise ValueError('Unknown JSON codec {0}'.format(codec))
@@ -1,13 +1,38 @@
 import sys
 import json
-import inspect
-from base64 import b64encode, b64decode
+from base64 import b64encode
+from binascii import a2b_base64
 try:
     from collections.abc import Callable
 except ImportError:
     from collections import Callable
+from .amscompress import compress_payload, decompress_payload
 from .amsexceptions import AmsMessageException
 
+# reserved attribute recording codec that compressed the payload
+CODEC_ATTRIBUTE = 'ams-codec'
+
+
+def _decode_payload(data, attributes):
+    """Base64 decode payload and decompress it if it was compressed"""
+
+    try:
+        decoded = a2b_base64(data)
+    except Exception as e:
+        raise AmsMessageException('b64decode() {0}'.format(str(e)))
+
+    codec = attributes.get(CODEC_ATTRIBUTE) if isinstance(attributes, dict) else None
+    if codec:
+        try:
+            decoded = decompress_payload(decoded, codec)
+        except AmsMessageException:
+            raise
+        except Exception as e:
+            raise AmsMessageException('decompress() {0}'.format(str(e)))
+
+    return decoded
+
+
 class AmsMessage(Callable):
     """Abstraction of AMS Message
 
@@ -15,13 +40,20 @@ class AmsMessage(Callable):
        and arbitrary number of attributes. Data is Base64
        encoded prior dispatching message to AMS service and
        Base64 decoded when it is being pulled from service.
+
+       Data can be compressed with codec (zlib, lzma or zstd if zstandard
+       is installed) before it is Base64 encoded. Codec is recorded in the
+       reserved ams-codec attribute so get_data() of the pulled message
+       decompresses it.
     """
+    __slots__ = ('_attributes', '_data', '_decoded', '_messageId', '_publishTime')
+
     def __init__(self, b64enc=True, attributes='', data=None,
-                 messageId='', publishTime=''):
+                 messageId='', publishTime='', codec=None):
         self._attributes = attributes
         self._messageId = messageId
         self._publishTime = publishTime
-        self.set_data(data, b64enc)
+        self.set_data(data, b64enc, codec)
 
     def __call__(self, **kwargs):
         if 'attributes' not in kwargs:
@@ -45,7 +77,7 @@ class AmsMessage(Callable):
         """
         self._attributes.update({key: value})
 
-    def set_data(self, data, b64enc=True):
+    def set_data(self, data, b64enc=True, codec=None):
         """Set data of message
 
            Default behaviour is to Base64 encode data prior sending it by the
@@ -56,8 +88,21 @@ class AmsMessage(Callable):
                data (str): Data of the message
            Kwargs:
                b64enc (bool): Control whether data should be Base64 encoded
+               codec (str): Compress data with zlib, lzma or zstd before it
+                            is Base64 encoded
         """
+        # decoded data is cached on first get_data()
+        self._decoded = None
         if b64enc and data:
+            if codec:
+                try:
+                    if not isinstance(data, bytes):
+                        data = data.encode('utf-8')
+                    data = compress_payload(data, codec)
+                except AmsMessageException:
+                    raise
+                except Exception as e:
+                    raise AmsMessageException('compress() {0}'.format(str(e)))
             try:
                 if sys.version_info < (3, ):
                     self._data = b64encode(data)
@@ -68,28 +113,65 @@ class AmsMessage(Callable):
                         self._data = str(b64encode(bytearray(data, 'utf-8')), 'utf-8')
             except Exception as e:
                 raise AmsMessageException('b64encode() {0}'.format(str(e)))
+            self._set_codec(codec)
         elif data:
             self._data = data
 
+    def _set_codec(self, codec):
+        # attributes are copied so the caller's dict is not modified
+        if codec:
+            attributes = dict(self._attributes) if self._attributes else dict()
+            attributes[CODEC_ATTRIBUTE] = codec
+            self._attributes = attributes
+        elif isinstance(self._attributes, dict) and CODEC_ATTRIBUTE in self._attributes:
+            attributes = dict(self._attributes)
+            del attributes[CODEC_ATTRIBUTE]
+            self._attributes = attributes
+
     def dict(self):
         """Construct python dict from message"""
 
-        if self._has_dataattr():
-            d = dict()
-            for attr in ['attributes', 'data', 'messageId', 'publishTime']:
-                if getattr(self, '_{0}'.format(attr), False):
-                    v = eval('self._{0}'.format(attr))
-                    d.update({attr: v})
-            return d
+        # data is set only once non-empty data is given so it may be missing
+        data = getattr(self, '_data', None)
+        attributes = self._attributes
+        if not data and not attributes:
+            raise AmsMessageException('At least data field or one attribute needs to be defined')
+
+        d = dict()
+        if attributes:
+            d['attributes'] = attributes
+        if data:
+            d['data'] = data
+        if self._messageId:
+            d['messageId'] = self._messageId
+        if self._publishTime:
+            d['publishTime'] = self._publishTime
+
+        return d
 
     def get_data(self):
-        """Fetch the data of the message and Base64 decode it"""
+        """Fetch the data of the message and Base64 decode it
+
+           Data compressed with codec is decompressed. Data is decoded on
+           the first call and the decoded value is reused by the following
+           ones.
+        """
 
         if self._has_dataattr():
-            try:
-                return b64decode(self._data)
-            except Exception as e:
-                raise AmsMessageException('b64decode() {0}'.format(str(e)))
+            if self._decoded is None:
+                self._decoded = _decode_payload(getattr(self, '_data', None), self._attributes)
+            return self._decoded
+
+    def get_data_view(self):
+        """Fetch the Base64 decoded data of the message as memoryview
+
+           View is made over the cached decoded data so slicing it doesn't
+           copy the payload.
+        """
+
+        data = self.get_data()
+        if data is not None:
+            return memoryview(data)
 
     def get_msgid(self):
         """Fetch the message id of the message"""
@@ -114,3 +196,86 @@ class AmsMessage(Callable):
 
     def __str__(self):
         return str(self.dict())
+
+
+class AmsMessageBatch(object):
+    """Columnar representation of messages pulled from subscription
+
+       Fields of pulled messages are kept in parallel lists instead of
+       AmsMessage object for every message. Base64 data of all messages is
+       decoded at once on first access and AmsMessage object of the message
+       is created only when the message is accessed by index or iteration.
+       Batch can be used in place of list of (ackId, AmsMessage) tuples
+       returned by pull.
+
+       Args:
+           received (list): receivedMessages of pull response
+    """
+
+    def __init__(self, received):
+        self.ack_ids = [m['ackId'] for m in received]
+        messages = [m['message'] for m in received]
+        self.message_ids = [m.get('messageId', '') for m in messages]
+        self.publish_times = [m.get('publishTime', '') for m in messages]
+        self.attributes = [m.get('attributes', '') for m in messages]
+        # Base64 encoded data as received from the service
+        self.data = [m.get('data') for m in messages]
+        self._decoded = None
+
+    def __len__(self):
+        return len(self.ack_ids)
+
+    def __bool__(self):
+        return bool(self.ack_ids)
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        for i in range(len(self.ack_ids)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            # same as slice of list of (ackId, AmsMessage) tuples
+            return [self[j] for j in range(*i.indices(len(self.ack_ids)))]
+
+        return (self.ack_ids[i], self.message(i))
+
+    def decode(self):
+        """Base64 decode data of all messages
+
+           Return:
+               list: Decoded data of messages, None for messages without data
+        """
+
+        if self._decoded is None:
+            self._decoded = [_decode_payload(d, a) if d else None
+                             for d, a in zip(self.data, self.attributes)]
+
+        return self._decoded
+
+    def get_data(self, i):
+        """Fetch the decoded data of the message at index
+
+           Args:
+               i (int): Index of the message
+        """
+
+        return self.decode()[i]
+
+    def message(self, i):
+        """Create AmsMessage of the message at index
+
+           Args:
+               i (int): Index of the message
+           Return:
+               AmsMessage: message sharing decoded data with the batch
+        """
+
+        msg = AmsMessage(b64enc=False, attributes=self.attributes[i],
+                         data=self.data[i], messageId=self.message_ids[i],
+                         publishTime=self.publish_times[i])
+        if self._decoded is not None:
+            msg._decoded = self._decoded[i]
+
+        return msg
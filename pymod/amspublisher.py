@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+
+from concurrent.futures import Future
+
+from .amsexceptions import AmsException, AmsMessageException
+from .amsmsg import AmsMessage
+
+log = logging.getLogger(__name__)
+
+
+class AmsBatchPublisher(object):
+    """Publisher that buffers messages and publishes them in batches
+
+       Messages handed to publish() are buffered and published to topic with
+       one ArgoMessagingService.publish() call from background thread as soon
+       as one of the limits is hit: number of buffered messages, size of the
+       serialized publish request or time the oldest message is waiting in
+       buffer. Batches are published one at a time in order in which messages
+       were buffered.
+
+       Args:
+           topic (AmsTopic): Topic that messages will be published to
+       Kwargs:
+           max_messages (int): Maximum number of messages in one batch
+           max_bytes (int): Maximum size of serialized publish request in
+                            bytes. Should be kept under the limit of the AMS
+                            service to avoid HTTP 413 responses.
+           max_latency (float): Maximum number of seconds message can wait
+                                in buffer before batch is published
+           retry, retrysleep, retrybackoff: retry options passed to
+                                            ArgoMessagingService.publish()
+           reqkwargs: keyword argument that will be passed to underlying
+                      python-requests library call.
+    """
+
+    def __init__(self, topic, max_messages=100, max_bytes=1024 * 1024,
+                 max_latency=0.05, retry=0, retrysleep=60, retrybackoff=None,
+                 **reqkwargs):
+        self.topic = topic
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.retry = retry
+        self.retrysleep = retrysleep
+        self.retrybackoff = retrybackoff
+        self.reqkwargs = reqkwargs
+
+        # sizes are measured with the codec that serializes publish request,
+        # envelope {"messages": [...]} and separator between messages
+        self._codec = topic.init.json_codec
+        self._envelope_size = self._encoded_size({"messages": []})
+        self._separator_size = (self._encoded_size({"messages": [0, 0]}) -
+                                self._encoded_size({"messages": [0]}) - 1)
+
+        self._cond = threading.Condition()
+        # buffered (message dict, serialized size, future, time) tuples
+        self._pending = list()
+        self._pending_bytes = self._envelope_size
+        self._inflight = 0
+        self._flushing = False
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run,
+                                        name='AmsBatchPublisher-{0}'.format(topic.name))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _encoded_size(self, obj):
+        encoded = self._codec.dumps(obj)
+        if not isinstance(encoded, bytes):
+            encoded = encoded.encode('utf-8')
+
+        return len(encoded)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def publish(self, msg):
+        """Buffer message for publishing
+
+           Args:
+               msg (AmsMessage, dict): Message to publish
+           Return:
+               concurrent.futures.Future: Future resolving to messageId of
+                                          the published message
+        """
+        if isinstance(msg, AmsMessage):
+            msg = msg.dict()
+        try:
+            size = self._encoded_size(msg) + self._separator_size
+        except TypeError as e:
+            raise AmsMessageException(e)
+
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise AmsException('Publisher for topic {0} is closed'.format(self.topic.name))
+            self._pending.append((msg, size, future, time.time()))
+            self._pending_bytes += size
+            self._cond.notify_all()
+
+        return future
+
+    def flush(self):
+        """Publish all buffered messages and wait until they are published"""
+
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._pending or self._inflight:
+                self._cond.wait()
+            self._flushing = False
+
+    def close(self):
+        """Publish all buffered messages and stop background thread"""
+
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _batch_ready(self):
+        if not self._pending:
+            return False
+        if self._closed or self._flushing:
+            return True
+        if (len(self._pending) >= self.max_messages or
+                self._pending_bytes >= self.max_bytes):
+            return True
+
+        return time.time() - self._pending[0][3] >= self.max_latency
+
+    def _take_batch(self):
+        batch, size = list(), self._envelope_size
+        for item in self._pending:
+            if batch and (len(batch) >= self.max_messages or
+                          size + item[1] > self.max_bytes):
+                break
+            batch.append(item)
+            size += item[1]
+
+        del self._pending[:len(batch)]
+        self._pending_bytes -= size - self._envelope_size
+
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._batch_ready():
+                    if self._closed and not self._pending:
+                        return
+                    if self._pending:
+                        timeout = self.max_latency - (time.time() - self._pending[0][3])
+                        self._cond.wait(max(timeout, 0))
+                    else:
+                        self._cond.wait()
+                batch = self._take_batch()
+                self._inflight += 1
+
+            try:
+                self._send(batch)
+            finally:
+                with self._cond:
+                    self._inflight -= 1
+                    self._cond.notify_all()
+
+    def _send(self, batch):
+        futures = [item[2] for item in batch]
+        try:
+            r = self.topic.init.publish(self.topic.name,
+                                        [item[0] for item in batch],
+                                        retry=self.retry,
+                                        retrysleep=self.retrysleep,
+                                        retrybackoff=self.retrybackoff,
+                                        **self.reqkwargs)
+            ids = r['messageIds']
+            if len(ids) != len(futures):
+                raise AmsException('Expected {0} messageIds, got {1}'.format(len(futures), len(ids)))
+        except Exception as e:
+            log.warning('Publishing batch of {0} messages to {1} failed: {2}'.format(
+                len(batch), self.topic.name, e))
+            for f in futures:
+                f.set_exception(e)
+        else:
+            for f, msgid in zip(futures, ids):
+                f.set_result(msgid)
@@ -0,0 +1,123 @@
+import threading
+import weakref
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+
+class AmsRegistry(MutableMapping):
+    """Bounded registry of AmsTopic and AmsSubscription objects
+
+       Keeps at most maxsize objects ordered by use. Inserting object to
+       full registry evicts the least recently used one. Evicted objects are
+       still weakly referenced, so lookup of object that is in use elsewhere
+       returns the same object and puts it back into registry, while objects
+       nobody holds are freed.
+
+       Kwargs:
+           maxsize (int): Maximum number of objects kept, unbounded if None
+    """
+
+    def __init__(self, maxsize=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('Registry size must be at least 1')
+        self.maxsize = maxsize
+        self._objs = OrderedDict()
+        self._evicted = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _insert(self, key, value):
+        self._objs.pop(key, None)
+        self._objs[key] = value
+        while self.maxsize is not None and len(self._objs) > self.maxsize:
+            evicted_key, evicted = self._objs.popitem(last=False)
+            try:
+                self._evicted[evicted_key] = evicted
+            except TypeError:
+                # object cannot be weakly referenced
+                pass
+            self.evictions += 1
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._objs:
+                value = self._objs.pop(key)
+                self._objs[key] = value
+                self.hits += 1
+                return value
+
+            value = self._evicted.pop(key, None)
+            if value is None:
+                self.misses += 1
+                raise KeyError(key)
+
+            self.hits += 1
+            self._insert(key, value)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._evicted.pop(key, None)
+            self._insert(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            found = self._objs.pop(key, None) is not None
+            found = self._evicted.pop(key, None) is not None or found
+            if not found:
+                raise KeyError(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._objs or key in self._evicted
+
+    def __iter__(self):
+        return iter(self.copy())
+
+    def __len__(self):
+        return len(self._objs)
+
+    def copy(self):
+        """Objects kept in registry ordered from the least recently used
+
+           Return:
+               OrderedDict: Full name mapped to object
+        """
+        with self._lock:
+            return OrderedDict(self._objs)
+
+    def alive_values(self):
+        """Objects kept in registry and evicted ones still in use elsewhere,
+           without affecting their order or lookup counters
+
+           Return:
+               list: AmsTopic or AmsSubscription objects
+        """
+        with self._lock:
+            return list(self._objs.values()) + list(self._evicted.values())
+
+    def clear(self):
+        with self._lock:
+            self._objs.clear()
+            self._evicted.clear()
+
+    def stats(self):
+        """Counters of registry lookups
+
+           Return:
+               dict: hits, misses, evictions, size and maxsize
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'size': len(self._objs),
+                    'maxsize': self.maxsize}
@@ -0,0 +1,205 @@
+import random
+import threading
+import time
+
+from .amsexceptions import (AmsBalancerException, AmsConnectionException,
+                            AmsTimeoutException)
+
+# exceptions that are retried by default, the same as with retry argument
+RETRIABLE_EXCEPTIONS = (AmsBalancerException, AmsConnectionException,
+                        AmsTimeoutException)
+
+
+class AmsRetryBudget(object):
+    """Token bucket limiting number of retries made by one client
+
+       Every retry takes one token from the bucket that is refilled with
+       refill_rate tokens per second up to capacity. When bucket is empty,
+       failed requests are not retried, so clients don't multiply the load
+       of service that is already failing.
+
+       Kwargs:
+           capacity (float): Maximum number of tokens
+           refill_rate (float): Tokens added per second
+    """
+
+    def __init__(self, capacity=10, refill_rate=1.0):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = float(capacity)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take token for one retry
+
+           Return:
+               bool: False if budget is exhausted
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.refill_rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+
+            return False
+
+    def tokens(self):
+        """Number of tokens currently available"""
+
+        with self._lock:
+            return min(self.capacity,
+                       self._tokens + (time.time() - self._updated) * self.refill_rate)
+
+
+class AmsRetryPolicy(object):
+    """Policy deciding whether and after how long failed request is retried
+
+       Sleep before retry n (counted from 0) is derived from exponential
+       backoff base * 2 ** n capped to cap seconds and randomized with
+       jitter so that clients failing at the same time don't retry in
+       lockstep:
+
+           - full: uniformly random between 0 and backoff
+           - decorrelated: uniformly random between base and three times
+             the previous sleep, capped to cap
+           - None: backoff without randomization
+
+       Kwargs:
+           retries (int): Maximum number of retries
+           base (float): Sleep before the first retry in seconds
+           cap (float): Maximum sleep in seconds
+           jitter (str): full, decorrelated or None
+           max_elapsed (float): Request is not retried when sleep would
+                                exceed this number of seconds since the
+                                first attempt
+           budget (AmsRetryBudget): Budget shared by requests of client
+           retry_on (tuple): Exceptions that are retried
+    """
+
+    def __init__(self, retries=3, base=0.5, cap=30, jitter='full',
+                 max_elapsed=None, budget=None, retry_on=RETRIABLE_EXCEPTIONS):
+        if jitter not in ('full', 'decorrelated', None):
+            raise ValueError('Unknown jitter {0}'.format(jitter))
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.budget = budget
+        self.retry_on = retry_on
+
+    def sleep_time(self, attempt, previous):
+        """Sleep before retry
+
+           Args:
+               attempt (int): Number of retry counted from 0
+               previous (float): Previous sleep, None before the first retry
+        """
+        if self.jitter == 'decorrelated':
+            previous = previous or self.base
+            return min(self.cap, random.uniform(self.base, previous * 3))
+
+        backoff = min(self.cap, self.base * 2 ** attempt)
+        if self.jitter == 'full':
+            return random.uniform(0, backoff)
+
+        return backoff
+
+    def start(self, route_name=None, stats=None):
+        """Begin retry decisions for one request
+
+           Kwargs:
+               route_name (str): Route of the request, used for statistics
+               stats (AmsRetryStats): Statistics updated with decisions
+           Return:
+               AmsRetryState
+        """
+        return AmsRetryState(self, route_name, stats)
+
+
+class AmsRetryState(object):
+    """Retry decisions of one request made by AmsRetryPolicy"""
+
+    def __init__(self, policy, route_name=None, stats=None):
+        self.policy = policy
+        self.route_name = route_name
+        self.stats = stats
+        self.attempt = 0
+        self.previous = None
+        self.started = time.time()
+        if stats is not None:
+            stats.record(route_name, 'requests')
+
+    def next_sleep(self, exp):
+        """Decide whether request failed with exp should be retried
+
+           Args:
+               exp (Exception): Exception the attempt failed with
+           Return:
+               float: Seconds to sleep before the retry or None if request
+                      should not be retried
+        """
+        policy = self.policy
+        if not isinstance(exp, policy.retry_on):
+            return None
+
+        if self.attempt >= policy.retries:
+            return self._give_up('exhausted')
+
+        sleep = policy.sleep_time(self.attempt, self.previous)
+        if (policy.max_elapsed is not None and
+                time.time() - self.started + sleep > policy.max_elapsed):
+            return self._give_up('elapsed')
+
+        if policy.budget is not None and not policy.budget.acquire():
+            return self._give_up('budget')
+
+        self.attempt += 1
+        self.previous = sleep
+        if self.stats is not None:
+            self.stats.record(self.route_name, 'retries', sleep=sleep)
+
+        return sleep
+
+    def _give_up(self, reason):
+        if self.stats is not None:
+            self.stats.record(self.route_name, 'gave_up_{0}'.format(reason))
+
+        return None
+
+
+class AmsRetryStats(object):
+    """Thread safe counters of retry decisions per route"""
+
+    _counters = ('requests', 'retries', 'gave_up_exhausted',
+                 'gave_up_elapsed', 'gave_up_budget')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = dict()
+
+    def record(self, route_name, counter, sleep=0):
+        with self._lock:
+            route = self._routes.get(route_name)
+            if route is None:
+                route = dict((c, 0) for c in self._counters)
+                route.update(sleep_seconds=0.0, last_sleep=None)
+                self._routes[route_name] = route
+            route[counter] += 1
+            if counter == 'retries':
+                route['sleep_seconds'] += sleep
+                route['last_sleep'] = sleep
+
+    def snapshot(self):
+        """Copy of counters
+
+           Return:
+               dict: Route name mapped to dict of counters
+        """
+        with self._lock:
+            return dict((route, dict(counters))
+                        for route, counters in self._routes.items())
@@ -0,0 +1,282 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class _SubState(object):
+    """Polling state of one subscription serviced by scheduler"""
+
+    def __init__(self, sub, interval):
+        self.sub = sub
+        self.interval = interval
+        self.inflight = 0
+        self.removed = False
+
+        self.pulls = 0
+        self.empty_pulls = 0
+        self.messages = 0
+        self.errors = 0
+        self.last_error = None
+
+
+class AmsConsumerScheduler(object):
+    """Consumer of many subscriptions serviced from small pool of workers
+
+       Instead of dedicating one thread blocked in pull to each subscription,
+       scheduler keeps subscriptions in a queue ordered by time of their next
+       poll and hands due ones to a pool of workers. Every poll is a pull
+       with return_immediately so worker is never held by an idle
+       subscription. Polling adapts to traffic of each subscription:
+
+           - full batch: subscription is polled again right away
+           - partial batch: subscription is polled again after min_interval
+           - no messages or error: interval is multiplied by backoff, up to
+             max_interval
+
+       Subscriptions due at the same time are polled in order in which they
+       became due, so busy subscriptions can't starve the others.
+
+       Pulled messages are passed to callback(sub, msgs) as list of
+       (ackId, AmsMessage) tuples. If ack is True, messages are acknowledged
+       after callback returned. If callback raises, messages are not
+       acknowledged and will be redelivered by AMS after ackdeadline.
+
+       Pull returns messages from the last acknowledged offset, so only one
+       pull of subscription is in progress at a time and the next one is
+       made after the previous batch was acknowledged. With
+       max_concurrency > 1 pulled batch is split into up to max_concurrency
+       parts passed to callback concurrently, and the batch is acknowledged
+       when all of them returned.
+
+       Args:
+           subs (list): AmsSubscription objects to consume
+           callback (callable): Called with subscription and list of pulled
+                                messages
+       Kwargs:
+           workers (int): Number of worker threads
+           batch (int): Number of messages to pull at once
+           min_interval (float): Seconds between polls of subscription that
+                                 returned messages
+           max_interval (float): Upper bound of interval of idle subscription
+           backoff (float): Factor interval is multiplied with after empty
+                            pull
+           max_concurrency (int): Maximum number of concurrent callbacks
+                                  processing one pulled batch
+           ack (bool): Acknowledge messages after callback returned
+           retry, retrysleep, retrybackoff: retry options passed to
+                                            ArgoMessagingService.pull_sub()
+           reqkwargs: keyword argument that will be passed to underlying
+                      python-requests library call.
+    """
+
+    def __init__(self, subs, callback, workers=4, batch=100, min_interval=0.5,
+                 max_interval=30, backoff=2.0, max_concurrency=1, ack=True,
+                 retry=0, retrysleep=60, retrybackoff=None, **reqkwargs):
+        self.callback = callback
+        self.workers = workers
+        self.batch = batch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.ack = ack
+        self.retry = retry
+        self.retrysleep = retrysleep
+        self.retrybackoff = retrybackoff
+        self.reqkwargs = reqkwargs
+
+        self._cond = threading.Condition()
+        self._heap = list()
+        self._seq = itertools.count()
+        self._subs = dict()
+        self._free = workers
+        self._stopped = True
+        self._thread = None
+        self._executor = None
+        self._helpers = None
+
+        for sub in subs:
+            self.add(sub)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add(self, sub):
+        """Start consuming subscription
+
+           Args:
+               sub (AmsSubscription): Subscription to consume
+        """
+        with self._cond:
+            if sub.name in self._subs:
+                return
+            state = _SubState(sub, self.min_interval)
+            self._subs[sub.name] = state
+            self._push(state, time.time())
+            self._cond.notify_all()
+
+    def remove(self, name):
+        """Stop consuming subscription. Pulls already in progress are
+           completed.
+
+           Args:
+               name (str): Subscription name
+        """
+        with self._cond:
+            state = self._subs.pop(name, None)
+            if state is not None:
+                state.removed = True
+
+    def stats(self):
+        """Polling statistics of subscriptions
+
+           Return:
+               dict: Subscription name mapped to dict with number of pulls,
+                     empty pulls, pulled messages, errors, last error and
+                     current polling interval
+        """
+        with self._cond:
+            return dict((name, {'pulls': s.pulls,
+                                'empty_pulls': s.empty_pulls,
+                                'messages': s.messages,
+                                'errors': s.errors,
+                                'last_error': s.last_error,
+                                'interval': s.interval})
+                        for name, s in self._subs.items())
+
+    def start(self):
+        """Start dispatching of polls to workers"""
+
+        with self._cond:
+            if not self._stopped:
+                return
+            self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        if self.max_concurrency > 1:
+            # run the other parts of batches split by workers
+            self._helpers = ThreadPoolExecutor(
+                max_workers=self.workers * (self.max_concurrency - 1))
+        self._thread = threading.Thread(target=self._run, name='AmsConsumerScheduler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop dispatching of polls
+
+           Kwargs:
+               wait (bool): Wait for pulls and callbacks in progress
+        """
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=wait)
+        if self._helpers is not None:
+            self._helpers.shutdown(wait=wait)
+            self._helpers = None
+
+    def _push(self, state, due):
+        heapq.heappush(self._heap, (due, next(self._seq), state))
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                if not self._heap or not self._free:
+                    self._cond.wait()
+                    continue
+                due, _, state = self._heap[0]
+                if state.removed:
+                    heapq.heappop(self._heap)
+                    continue
+                now = time.time()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                self._free -= 1
+                state.inflight += 1
+                self._executor.submit(self._poll, state)
+
+    def _poll(self, state):
+        sub = state.sub
+        msgs, error = list(), None
+        try:
+            msgs = sub.init.pull_sub(sub.name, self.batch,
+                                     return_immediately=True,
+                                     retry=self.retry,
+                                     retrysleep=self.retrysleep,
+                                     retrybackoff=self.retrybackoff,
+                                     **self.reqkwargs)
+            if msgs:
+                self._process(sub, msgs)
+                if self.ack:
+                    sub.init.ack_sub(sub.name, [id for id, _ in msgs],
+                                     **self.reqkwargs)
+        except Exception as e:
+            error = e
+            log.warning('Consuming subscription {0} failed: {1}'.format(sub.name, e))
+        finally:
+            with self._cond:
+                self._free += 1
+                state.inflight -= 1
+                self._reschedule(state, len(msgs), error)
+                self._cond.notify_all()
+
+    def _process(self, sub, msgs):
+        parts = min(self.max_concurrency, len(msgs))
+        if parts < 2 or self._helpers is None:
+            self.callback(sub, msgs)
+            return
+
+        size = -(-len(msgs) // parts)
+        chunks = [msgs[i:i + size] for i in range(0, len(msgs), size)]
+        futures = [self._helpers.submit(self.callback, sub, chunk)
+                   for chunk in chunks[1:]]
+        error = None
+        try:
+            self.callback(sub, chunks[0])
+        except Exception as e:
+            error = e
+        for f in futures:
+            if error is None:
+                error = f.exception()
+            else:
+                f.exception()
+        if error is not None:
+            raise error
+
+    def _reschedule(self, state, count, error):
+        state.pulls += 1
+        state.messages += count
+        now = time.time()
+
+        if error is not None:
+            state.errors += 1
+            state.last_error = error
+        if error is not None or not count:
+            if not count:
+                state.empty_pulls += 1
+            state.interval = min(max(state.interval, self.min_interval) * self.backoff,
+                                 self.max_interval)
+            due = now + state.interval
+        elif count >= self.batch:
+            state.interval = self.min_interval
+            due = now
+        else:
+            state.interval = self.min_interval
+            due = now + state.interval
+
+        if not state.removed:
+            self._push(state, due)
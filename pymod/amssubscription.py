@@ -1,3 +1,14 @@
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from .amsack import AmsAckManager, ackid_offset, unseen_messages
+
+
 class AmsSubscription(object):
     """Abstraction of AMS subscription
 
@@ -14,6 +25,10 @@ class AmsSubscription(object):
         self.init = init
         self.fullname = fullname
         self.topic = self.init.topics[topic]
+        self.name = self._build_name(self.fullname)
+        self._load_metadata(pushconfig, ackdeadline)
+
+    def _load_metadata(self, pushconfig, ackdeadline):
         self.push_endpoint = ''
         self.retry_policy_type = ''
         self.retry_policy_period = ''
@@ -22,7 +37,8 @@ class AmsSubscription(object):
             self.retry_policy_type = pushconfig['retryPolicy']['type']
             self.retry_policy_period = pushconfig['retryPolicy']['period']
         self.ackdeadline = ackdeadline
-        self.name = self._build_name(self.fullname)
+        # time metadata was fetched from service, used by metadata cache
+        self.fetched = time.time()
 
     def delete(self):
         """Delete subscription"""
@@ -49,7 +65,7 @@ class AmsSubscription(object):
                                         **reqkwargs)
 
     def pull(self, num=1, retry=0, retrysleep=60, retrybackoff=None,
-             return_immediately=False, **reqkwargs):
+             return_immediately=False, as_batch=False, **reqkwargs):
         """Pull messages from subscription
 
            Kwargs:
@@ -64,15 +80,171 @@ class AmsSubscription(object):
                return_immediately (boolean): If True and if stream of messages is empty,
                                              subscriber call will not block and wait for
                                              messages
+               as_batch (boolean): Return messages as AmsMessageBatch
                reqkwargs: keyword argument that will be passed to underlying
                           python-requests library call.
            Return:
-               [(ackId, AmsMessage)]: List of tuples with ackId and AmsMessage instance
+               [(ackId, AmsMessage)]: List of tuples with ackId and AmsMessage
+                                      instance or AmsMessageBatch
         """
 
         return self.init.pull_sub(self.name, num=num,
                                   return_immediately=return_immediately,
-                                  **reqkwargs)
+                                  as_batch=as_batch, **reqkwargs)
+
+    def iter_pull(self, num=1, retry=0, retrysleep=60, retrybackoff=None,
+                  return_immediately=False, chunk_size=65536, **reqkwargs):
+        """Pull messages from subscription and parse response incrementally
+
+           Kwargs:
+               num (int): Number of messages to pull
+               retry: int. Number of request retries before giving up.
+               retrysleep: int. Static number of seconds to sleep before next
+                           request attempt
+               retrybackoff: int. Backoff factor to apply between each request
+                             attempts
+               return_immediately (boolean): If True and if stream of messages is empty,
+                                             subscriber call will not block and wait for
+                                             messages
+               chunk_size (int): Number of bytes read from response at once
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Return:
+               iterator: (ackId, AmsMessage) tuples yielded as they are parsed
+        """
+
+        return self.init.iter_pull_sub(self.name, num=num,
+                                       return_immediately=return_immediately,
+                                       retry=retry, retrysleep=retrysleep,
+                                       retrybackoff=retrybackoff,
+                                       chunk_size=chunk_size, **reqkwargs)
+
+    def stream(self, batch=100, prefetch=1, return_immediately=False,
+               retry=0, retrysleep=60, retrybackoff=None, ack_manager=None,
+               **reqkwargs):
+        """Iterate over messages pulled from subscription
+
+           Generator lazily yields pulled messages while next batch is
+           already being pulled in background thread, so consuming is not
+           stalled by round-trip of each pull. At most prefetch pulled batches
+           are buffered in memory. Messages are not acknowledged; caller
+           should ack() the ackIds of processed messages within ackdeadline
+           or they will be redelivered. Pull returns messages from the last
+           acknowledged offset, so background pull asks for the messages not
+           yet acknowledged plus batch and skips the ones already yielded.
+           If it brings nothing new, the next pull waits until consumer
+           went through a batch. Closing the generator stops the background
+           pulls.
+
+           Kwargs:
+               batch (int): Number of messages to pull with one request
+               prefetch (int): Number of pulled batches buffered ahead of
+                               the consumer
+               return_immediately (boolean): If True, stream ends when pull
+                                             returns no messages
+               retry: int. Number of request retries before giving up.
+               retrysleep: int. Static number of seconds to sleep before next
+                           request attempt
+               retrybackoff: int. Backoff factor to apply between each request
+                             attempts
+               ack_manager (AmsAckManager): Manager the pull time of each
+                                            batch is recorded with, so acks
+                                            collected by it are sent before
+                                            ackdeadline expires. Collected
+                                            acks are also sent once consumer
+                                            went through a batch, so the next
+                                            pull is not held back by them.
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Yields:
+               (ackId, AmsMessage): Tuple with ackId and AmsMessage instance
+        """
+        buf = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        # set when consumer went through a batch
+        drained = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buf.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def puller():
+            # pulled messages not known to be acknowledged yet
+            outstanding, pulled_at = list(), 0
+            try:
+                while not stop.is_set():
+                    drained.clear()
+                    msgs = self.init.pull_sub(self.name, num=batch + len(outstanding),
+                                              return_immediately=return_immediately,
+                                              retry=retry, retrysleep=retrysleep,
+                                              retrybackoff=retrybackoff,
+                                              **reqkwargs)
+                    if msgs and outstanding:
+                        # pull starts from the last acknowledged offset, so it
+                        # asks for the outstanding messages plus batch and
+                        # the ones pulled before are skipped
+                        first = ackid_offset(msgs[0][0])
+                        if first is not None:
+                            outstanding = [m for m in outstanding
+                                           if ackid_offset(m[0]) is None or ackid_offset(m[0]) >= first]
+                        new = unseen_messages(msgs, outstanding)[:batch] if outstanding else msgs[:batch]
+                        if not new:
+                            if ack_manager is not None and ack_manager.flush():
+                                # acks collected by manager were just sent
+                                continue
+                            remaining = pulled_at + float(self.ackdeadline) - time.time()
+                            if remaining > 0:
+                                # nothing new until consumer acks, which
+                                # is expected once it drained a batch
+                                drained.wait(remaining)
+                                continue
+                            # ackdeadline expired and AMS redelivers them
+                            new, outstanding = msgs[:batch], list()
+                        msgs = new
+                    elif not msgs:
+                        outstanding = list()
+                    if msgs:
+                        if ackid_offset(msgs[0][0]) is None:
+                            # acknowledged ones can't be told apart
+                            outstanding = list()
+                        outstanding.extend(msgs)
+                        pulled_at = time.time()
+                        if ack_manager is not None:
+                            ack_manager.pulled([id for id, _ in msgs], pulled_at)
+                        if not put(msgs):
+                            return
+                    elif return_immediately:
+                        break
+            except Exception as e:
+                put(e)
+                return
+            put(None)
+
+        t = threading.Thread(target=puller,
+                             name='AmsSubscription-stream-{0}'.format(self.name))
+        t.daemon = True
+        t.start()
+
+        try:
+            while True:
+                item = buf.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                for ackid, msg in item:
+                    yield ackid, msg
+                if ack_manager is not None:
+                    ack_manager.flush(wait=False)
+                drained.set()
+        finally:
+            stop.set()
+            drained.set()
 
     def pullack(self, num=1, retry=0, retrysleep=60, retrybackoff=None,
                 return_immediately=False, **reqkwargs):
@@ -105,6 +277,35 @@ class AmsSubscription(object):
                                      return_immediately=return_immediately,
                                      **reqkwargs)
 
+    def iter_pullack(self, num=1, retry=0, retrysleep=60, retrybackoff=None,
+                     return_immediately=False, **reqkwargs):
+        """Iterate over batches of pulled and acknowledged messages.
+
+           Acknowledgement of each batch is sent concurrently with the pull
+           of the next one. Failed acknowledgement resets consume cycle the
+           same as in pullack().
+
+           Kwargs:
+               num (int): Number of messages to pull
+               retry: int. Number of request retries before giving up.
+               retrysleep: int. Static number of seconds to sleep before next
+                           request attempt
+               retrybackoff: int. Backoff factor to apply between each request
+                             attempts
+               return_immediately (boolean): If True, iteration ends when
+                                             there are no more messages
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Yields:
+               [AmsMessage1, AmsMessage2]: List of AmsMessage instances
+        """
+
+        return self.init.iter_pullack_sub(self.name, num=num,
+                                          return_immediately=return_immediately,
+                                          retry=retry, retrysleep=retrysleep,
+                                          retrybackoff=retrybackoff,
+                                          **reqkwargs)
+
     def time_to_offset(self, timestamp, **reqkwargs):
         """
            Retrieve the closest(greater than) available offset to the given timestamp.
@@ -176,3 +377,22 @@ class AmsSubscription(object):
         """
 
         return self.init.ack_sub(self.name, ids, **reqkwargs)
+
+    def ack_manager(self, max_pending=100, interval=None, **reqkwargs):
+        """Create manager that collects ackIds of processed messages and
+           acknowledges them in background with the highest ackId only
+
+           Kwargs:
+               max_pending (int): Number of collected ackIds that triggers ack
+               interval (float): Maximum number of seconds collected ackId
+                                 waits before ack is sent. Capped to half of
+                                 ackdeadline, which is also counted from
+                                 the pull recorded with pulled().
+               reqkwargs: keyword argument that will be passed to underlying
+                          python-requests library call.
+           Return:
+               object (AmsAckManager)
+        """
+
+        return AmsAckManager(self, max_pending=max_pending, interval=interval,
+                             **reqkwargs)
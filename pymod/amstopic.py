@@ -1,4 +1,7 @@
+import time
+
 from .amsexceptions import AmsException
+from .amspublisher import AmsBatchPublisher
 
 
 class AmsTopic(object):
@@ -17,6 +20,8 @@ class AmsTopic(object):
         self.init = init
         self.fullname = fullname
         self.name = self._build_name(self.fullname)
+        # time metadata was fetched from service, used by metadata cache
+        self.fetched = time.time()
 
     def delete(self):
         """Delete topic
@@ -77,7 +82,8 @@ class AmsTopic(object):
         for s in self.init.iter_subs(topic=self.name):
             yield s
 
-    def publish(self, msg, retry=0, retrysleep=60, retrybackoff=None, **reqkwargs):
+    def publish(self, msg, retry=0, retrysleep=60, retrybackoff=None,
+                max_request_bytes=None, **reqkwargs):
         """Publish message to topic
 
            Args:
@@ -91,6 +97,8 @@ class AmsTopic(object):
                            request attempt
                retrybackoff: int. Backoff factor to apply between each request
                              attempts
+               max_request_bytes: int. Split list of messages into several
+                                  publish requests not larger than this
 
                reqkwargs: Keyword argument that will be passed to underlying
                           python-requests library call.
@@ -101,4 +109,34 @@ class AmsTopic(object):
 
         return self.init.publish(self.name, msg, retry=retry,
                                  retrysleep=retrysleep,
+                                 retrybackoff=retrybackoff,
+                                 max_request_bytes=max_request_bytes,
+                                 **reqkwargs)
+
+    def batch_publisher(self, max_messages=100, max_bytes=1024 * 1024,
+                        max_latency=0.05, retry=0, retrysleep=60,
+                        retrybackoff=None, **reqkwargs):
+        """Create publisher that buffers messages and publishes them to
+           topic in batches
+
+           Kwargs:
+               max_messages (int): Maximum number of messages in one batch
+               max_bytes (int): Maximum size of serialized publish request
+               max_latency (float): Maximum number of seconds message can
+                                    wait in buffer before it is published
+               retry: int. Number of request retries before giving up.
+               retrysleep: int. Static number of seconds to sleep before next
+                           request attempt
+               retrybackoff: int. Backoff factor to apply between each request
+                             attempts
+               reqkwargs: Keyword argument that will be passed to underlying
+                          python-requests library call.
+
+           Returns:
+               object (AmsBatchPublisher)
+        """
+
+        return AmsBatchPublisher(self, max_messages=max_messages,
+                                 max_bytes=max_bytes, max_latency=max_latency,
+                                 retry=retry, retrysleep=retrysleep,
                                  retrybackoff=retrybackoff, **reqkwargs)
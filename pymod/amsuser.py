@@ -221,3 +221,45 @@ class AmsUserPage(object):
         self.users = users
         self.total_size = total_size
         self.next_page_token = next_page_token
+
+
+class AmsUserRecord(object):
+    __slots__ = ('data', '_user')
+
+    def __init__(self, user_dict):
+        """
+        Lightweight user record keeping the user data as returned by the service.
+        The full AmsUser object with its AmsUserProject list is built only when
+        one of its fields other than name, uuid and email is accessed or user() is called.
+        :param user_dict: (dict) user data as returned by the service
+        """
+        self.data = user_dict
+        self._user = None
+
+    @property
+    def name(self):
+        return self.data.get("name", "")
+
+    @property
+    def uuid(self):
+        return self.data.get("uuid", "")
+
+    @property
+    def email(self):
+        return self.data.get("email", "")
+
+    def user(self):
+        """
+        Materialises the record
+        :return: (AmsUser) the user object filled with the record data
+        """
+        if self._user is None:
+            self._user = AmsUser().load_from_dict(self.data)
+
+        return self._user
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "data":
+            raise AttributeError(attr)
+
+        return getattr(self.user(), attr)
@@ -0,0 +1,111 @@
+import json
+import sys
+import unittest
+
+if sys.version_info < (3, 6):
+    raise unittest.SkipTest('asyncio client requires Python 3.6')
+
+import asyncio
+
+from httmock import urlmatch, HTTMock, response
+from pymod import AsyncArgoMessagingService, AmsThreadTransport
+from pymod import AmsMessage
+from pymod import AmsSubscription
+from pymod import AmsServiceException, AmsBalancerException
+
+from .amsmocks import SubMocks
+from .amsmocks import TopicMocks
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        self.ams = AsyncArgoMessagingService(endpoint="localhost",
+                                             token="s3cr3t", project="TEST")
+        self.ams.transport = AmsThreadTransport(self.ams.session)
+        self.submocks = SubMocks()
+        self.topicmocks = TopicMocks()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.ams.close())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def testPublish(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            assert request.headers["x-api-key"] == "s3cr3t"
+            req_body = json.loads(request.body)
+            self.assertEqual(req_body["messages"][0]["data"], "Zm9vMQ==")
+            self.assertEqual(req_body["messages"][0]["attributes"]["bar1"], "baz1")
+            return '{"messageIds":["1"]}'
+
+        with HTTMock(publish_mock):
+            msg = AmsMessage(data='foo1', attributes={'bar1': 'baz1'})
+            resp = self.run_async(self.ams.publish("topic1", msg))
+            self.assertEqual(resp["messageIds"], ["1"])
+
+    def testPullAck(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            req_body = json.loads(request.body)
+            self.assertEqual(req_body["maxMessages"], "1")
+            self.assertEqual(req_body["returnImmediately"], "true")
+            return '{"receivedMessages":[{"ackId":"projects/TEST/subscriptions/subscription1:1221",\
+                    "message":{"messageId":"1221","attributes":{"foo":"bar"},"data":"YmFzZTY0ZW5jb2RlZA==",\
+                    "publishTime":"2016-02-24T11:55:09.786127994Z"}}]}'
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:acknowledge",
+                  method="POST")
+        def ack_mock(url, request):
+            self.assertEqual(request.body, '{"ackIds": ["projects/TEST/subscriptions/subscription1:1221"]}')
+            return '{}'
+
+        with HTTMock(pull_mock, ack_mock):
+            msgs = self.run_async(self.ams.pullack_sub("subscription1", 1,
+                                                       return_immediately=True))
+            self.assertEqual(len(msgs), 1)
+            self.assertEqual(msgs[0].get_data(), b"base64encoded")
+            self.assertEqual(msgs[0].get_msgid(), "1221")
+            self.assertEqual(self.ams.pullopts["maxMessages"], "1")
+
+    def testGetSub(self):
+        with HTTMock(self.submocks.get_sub_mock, self.topicmocks.get_topic_mock):
+            sub = self.run_async(self.ams.get_sub("subscription1", retobj=True))
+            assert isinstance(sub, AmsSubscription)
+            self.assertEqual(sub.topic.name, "topic1")
+            topic = self.run_async(self.ams.get_topic("topic1"))
+            self.assertEqual(topic["name"], "/projects/TEST/topics/topic1")
+
+    def testErrors(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_502_mock(url, request):
+            return response(502, '<html><body>502 Bad Gateway</body></html>',
+                            None, None, 5, request)
+
+        with HTTMock(pull_502_mock):
+            self.assertRaises(AmsBalancerException, self.run_async,
+                              self.ams.pull_sub("subscription1", retry=1,
+                                                retrysleep=0.01))
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1",
+                  method="GET")
+        def get_topic_404_mock(url, request):
+            return response(404, '{"error":{"code": 404,"message":"Topic does not exist","status":"NOT_FOUND"}}',
+                            None, None, 5, request)
+
+        with HTTMock(get_topic_404_mock):
+            try:
+                self.run_async(self.ams.get_topic("topic1"))
+            except AmsServiceException as e:
+                self.assertEqual(e.code, 404)
+                self.assertEqual(e.status, "NOT_FOUND")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,25 @@
+import gc
 import json
+import mock
+import requests
 import sys
+import threading
 import unittest
+import zlib
 
 from httmock import urlmatch, HTTMock, response
 from pymod import ArgoMessagingService
 from pymod import AmsMessage
 from pymod import AmsTopic
 from pymod import AmsSubscription
+from pymod import AmsBulkResult
+from pymod import AmsJsonCodec
+from pymod import AmsRegistry
+from pymod import AmsConnectionException
+from pymod import AmsServiceException
+from pymod.amsjson import orjson
 import datetime
+import pymod.ams
 from .amsmocks import SubMocks
 from .amsmocks import TopicMocks
 
@@ -155,6 +167,41 @@ class TestClient(unittest.TestCase):
             self.assertEqual(obj1.name, 'topic1')
             self.assertEqual(obj2.name, 'topic2')
 
+    def testIterPages(self):
+        requests_made = list()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions",
+                  method="GET")
+        def paged_subs_mock(url, request):
+            requests_made.append("&".join(sorted(url.query.split("&"))))
+            if "pageToken=page2" in url.query:
+                return response(200, '{"subscriptions":[{"name": "/projects/TEST/subscriptions/sub3",\
+                                "topic": "/projects/TEST/topics/topic2","pushConfig": {"pushEndpoint": "", "retryPolicy": {}},\
+                                "ackDeadlineSeconds": 10}], "nextPageToken": "", "totalSize": 3}',
+                                None, None, 5, request)
+            return response(200, '{"subscriptions":[{"name": "/projects/TEST/subscriptions/sub1",\
+                            "topic": "/projects/TEST/topics/topic1","pushConfig": {"pushEndpoint": "", "retryPolicy": {}},\
+                            "ackDeadlineSeconds": 10},\
+                            {"name": "/projects/TEST/subscriptions/sub2",\
+                            "topic": "/projects/TEST/topics/topic2","pushConfig": {"pushEndpoint": "", "retryPolicy": {}},\
+                            "ackDeadlineSeconds": 10}], "nextPageToken": "page2", "totalSize": 3}',
+                            None, None, 5, request)
+
+        with HTTMock(paged_subs_mock):
+            subs = self.ams.iter_subs(page_size=2)
+            self.assertEqual(next(subs).name, "sub1")
+            # second page is requested only when first one is consumed
+            self.assertEqual(requests_made, ["pageSize=2"])
+            self.assertEqual([s.name for s in subs], ["sub2", "sub3"])
+            self.assertEqual(requests_made, ["pageSize=2", "pageSize=2&pageToken=page2"])
+
+            self.assertEqual([s.name for s in self.ams.iter_subs(topic="topic2", page_size=2)],
+                             ["sub2", "sub3"])
+
+            r = self.ams.list_subs(page_size=2, page_token="page2")
+            self.assertEqual(r["totalSize"], 3)
+            self.assertEqual(requests_made[-1], "pageSize=2&pageToken=page2")
+
     # Test Get a subscription ACL client request
     def testGetAclSubscription(self):
         # Execute ams client with mocked response
@@ -265,6 +312,378 @@ class TestClient(unittest.TestCase):
             self.assertEqual(resp_bulk["msgIds"][0], "1")
             self.assertEqual(resp_bulk["msgIds"][1], "2")
 
+    # Test Publish split into size bounded requests
+    def testPublishSplit(self):
+        bodies = list()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            bodies.append(request.body)
+            req_body = json.loads(request.body)
+            return json.dumps({"messageIds": [m["attributes"]["id"]
+                                              for m in req_body["messages"]]})
+
+        msgs = [AmsMessage(data='foo' * i, attributes={'id': str(i)})
+                for i in range(1, 41)]
+        with HTTMock(publish_mock):
+            resp = self.ams.publish("topic1", msgs)
+            self.assertEqual(len(bodies), 1)
+            self.assertEqual(bodies[0], json.dumps({"messages": [m.dict() for m in msgs]}))
+
+            del bodies[:]
+            resp = self.ams.publish("topic1", msgs, max_request_bytes=512)
+            self.assertEqual(resp["messageIds"], [str(i) for i in range(1, 41)])
+            assert len(bodies) > 1
+            for body in bodies:
+                assert len(body) <= 512
+
+    # Test requests and responses going through configured JSON codec
+    def testJsonCodec(self):
+        class CountingCodec(AmsJsonCodec):
+            calls = 0
+
+            def dumps(self, obj):
+                self.calls += 1
+                return super(CountingCodec, self).dumps(obj)
+
+            def loads(self, s):
+                self.calls += 1
+                return super(CountingCodec, self).loads(s)
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            req_body = json.loads(request.body)
+            return json.dumps({"messageIds": [m["attributes"]["id"]
+                                              for m in req_body["messages"]]})
+
+        msgs = [AmsMessage(data='foo', attributes={'id': str(i)}) for i in range(10)]
+        codec = CountingCodec()
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", json_codec=codec)
+        with HTTMock(publish_mock):
+            resp = ams.publish("topic1", msgs)
+            self.assertEqual(resp["messageIds"], [str(i) for i in range(10)])
+            self.assertEqual(codec.calls, 2)
+
+        self.assertRaises(ValueError, ArgoMessagingService, endpoint="localhost",
+                          token="s3cr3t", json_codec="nosuchcodec")
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def testOrjsonCodec(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            assert isinstance(request.body, bytes)
+            req_body = json.loads(request.body)
+            return json.dumps({"messageIds": [m["attributes"]["id"]
+                                              for m in req_body["messages"]]})
+
+        msgs = [AmsMessage(data='foo' * i, attributes={'id': str(i)})
+                for i in range(1, 41)]
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", json_codec="orjson")
+        with HTTMock(publish_mock):
+            resp = ams.publish("topic1", msgs, max_request_bytes=512)
+            self.assertEqual(resp["messageIds"], [str(i) for i in range(1, 41)])
+            resp = ams.publish("topic1", msgs[0])
+            self.assertEqual(resp["messageIds"], ["1"])
+
+    # Test compressed publish bodies
+    def testCompression(self):
+        encodings = list()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            encoding = request.headers.get("Content-Encoding")
+            encodings.append(encoding)
+            body = request.body
+            if encoding == "gzip":
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+            req_body = json.loads(body)
+            return json.dumps({"messageIds": [str(i) for i in range(len(req_body["messages"]))]})
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            assert "Content-Encoding" not in request.headers
+            return '{"receivedMessages": []}'
+
+        msgs = [AmsMessage(data='{"metric": "check", "status": "OK"}') for i in range(50)]
+        for compression in ["gzip", "deflate"]:
+            ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                       project="TEST", compression=compression,
+                                       compression_threshold=512)
+            with HTTMock(publish_mock, pull_mock):
+                resp = ams.publish("topic1", msgs)
+                self.assertEqual(len(resp["messageIds"]), 50)
+                ams.publish("topic1", msgs[0])
+                self.assertEqual(ams.pull_sub("subscription1"), [])
+            self.assertEqual(encodings, [compression, None])
+            del encodings[:]
+
+        # body is compressed once for all request attempts
+        attempts = list()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def flaky_publish_mock(url, request):
+            attempts.append(request.headers.get("Content-Encoding"))
+            if len(attempts) < 3:
+                return response(503, '{"error": {"code": 503, "message": "Unavailable"}}',
+                                None, None, 5, request)
+            return publish_mock(url, request)
+
+        with mock.patch('pymod.ams.compress', wraps=pymod.ams.compress) as compress:
+            with HTTMock(flaky_publish_mock):
+                resp = ams.publish("topic1", msgs, retry=2, retrysleep=0)
+            self.assertEqual(len(resp["messageIds"]), 50)
+            self.assertEqual(compress.call_count, 1)
+        self.assertEqual(attempts, ["deflate"] * 3)
+
+        self.assertRaises(ValueError, ArgoMessagingService, endpoint="localhost",
+                          token="s3cr3t", compression="br")
+
+    # Test balancing and failover between multiple endpoints
+    @mock.patch('pymod.amsendpoint.random.choice', side_effect=lambda seq: seq[0])
+    def testEndpointFailover(self, mock_choice):
+        hosts = list()
+
+        @urlmatch(netloc="ams1")
+        def ams1_mock(url, request):
+            hosts.append("ams1")
+            raise requests.exceptions.ConnectionError("connection refused")
+
+        @urlmatch(netloc="ams2", path="/v1/projects/TEST/topics", method="GET")
+        def ams2_list_mock(url, request):
+            hosts.append("ams2")
+            return '{"topics":[{"name":"/projects/TEST/topics/topic1"}]}'
+
+        @urlmatch(netloc="ams2", path="/v1/projects/TEST/topics/topic1:publish", method="POST")
+        def ams2_publish_mock(url, request):
+            hosts.append("ams2")
+            return '{"messageIds":["1"]}'
+
+        ams = ArgoMessagingService(endpoint=["ams1", "ams2"], token="s3cr3t",
+                                   project="TEST", endpoint_cooldown=60)
+        self.assertEqual(ams.endpoint, "ams1")
+        with HTTMock(ams1_mock, ams2_list_mock, ams2_publish_mock):
+            # idempotent route fails over to next endpoint
+            resp = ams.list_topics()
+            self.assertEqual(resp["topics"][0]["name"], "/projects/TEST/topics/topic1")
+            self.assertEqual(hosts, ["ams1", "ams2"])
+            stats = ams.endpoint_pool.stats()
+            self.assertTrue(stats["ams1"]["down"])
+            self.assertFalse(stats["ams2"]["down"])
+
+            # endpoint that is down is not used
+            ams.publish("topic1", AmsMessage(data="foo"))
+            self.assertEqual(hosts, ["ams1", "ams2", "ams2"])
+
+        ams = ArgoMessagingService(endpoint=["ams1", "ams2"], token="s3cr3t",
+                                   project="TEST")
+        with HTTMock(ams1_mock, ams2_publish_mock):
+            # publish is not failed over
+            self.assertRaises(AmsConnectionException, ams.publish, "topic1",
+                              AmsMessage(data="foo"))
+            ams.publish("topic1", AmsMessage(data="foo"))
+        self.assertEqual(ams.endpoint_pool.stats()["ams2"]["requests"], 1)
+        self.assertEqual(ams.endpoint_pool.stats()["ams2"]["outstanding"], 0)
+
+    # Test cached route URLs follow endpoint and project changes
+    def testRouteCache(self):
+        urls = list()
+
+        @urlmatch(path=r"/v1/projects/\w+/topics/topic1:publish", method="POST")
+        def publish_mock(url, request):
+            urls.append(request.url)
+            return '{"messageIds":["1"]}'
+
+        with HTTMock(publish_mock):
+            self.ams.publish("topic1", AmsMessage(data="foo"))
+            self.ams.publish("topic1", AmsMessage(data="foo"))
+            self.ams.project = "OTHER"
+            self.ams.publish("topic1", AmsMessage(data="foo"))
+            self.ams.endpoint = "ams.example.com"
+            self.ams.publish("topic1", AmsMessage(data="foo"))
+
+        self.assertEqual(urls, ["https://localhost/v1/projects/TEST/topics/topic1:publish",
+                                "https://localhost/v1/projects/TEST/topics/topic1:publish",
+                                "https://localhost/v1/projects/OTHER/topics/topic1:publish",
+                                "https://ams.example.com/v1/projects/OTHER/topics/topic1:publish"])
+
+        # the earliest composed routes are dropped
+        self.ams.route_cache_size = 2
+        for topic in ("topic1", "topic2", "topic1", "topic3"):
+            self.ams._project_route("topic_publish", topic)
+        self.assertEqual(list(self.ams._route_cache.keys()),
+                         [("topic_publish", "topic2"), ("topic_publish", "topic3")])
+
+    def testMetadataCache(self):
+        gets = list()
+        ackdeadline = [10]
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1",
+                  method="GET")
+        def get_sub_mock(url, request):
+            gets.append(url.path)
+            return response(200, '{"name": "/projects/TEST/subscriptions/subscription1",\
+                            "topic": "/projects/TEST/topics/topic1",\
+                            "pushConfig": {"pushEndpoint": "", "retryPolicy": {}},\
+                            "ackDeadlineSeconds": %d}' % ackdeadline[0], None, None, 5, request)
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1",
+                  method="GET")
+        def get_topic_mock(url, request):
+            gets.append(url.path)
+            return response(200, '{"name": "/projects/TEST/topics/topic1"}', None, None, 5, request)
+
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", metadata_ttl=60)
+        with HTTMock(get_sub_mock, get_topic_mock):
+            topic = ams.get_topic("topic1", retobj=True)
+            sub = topic.subscription("subscription1")
+            self.assertTrue(ams.has_topic("topic1"))
+            self.assertIs(ams.get_topic("topic1", retobj=True), topic)
+            self.assertIs(ams.get_sub("subscription1", retobj=True), sub)
+            self.assertEqual(len(gets), 2)
+
+            # plain get_* always returns fresh service response
+            ams.get_topic("topic1")
+            self.assertEqual(len(gets), 3)
+
+            # object fetched again is updated with service response
+            ackdeadline[0] = 99
+            ams.invalidate_sub("subscription1")
+            self.assertIs(ams.get_sub("subscription1", retobj=True), sub)
+            self.assertEqual(sub.ackdeadline, 99)
+            self.assertIs(ams._cached_sub("subscription1"), sub)
+            self.assertEqual(len(gets), 4)
+            self.assertIs(ams.get_sub("subscription1", retobj=True), sub)
+            self.assertEqual(len(gets), 4)
+
+            ams.invalidate_topic()
+            self.assertTrue(ams.has_topic("topic1"))
+            self.assertEqual(len(gets), 5)
+
+            ackdeadline[0] = 30
+            self.assertIs(ams.refresh_sub("subscription1"), sub)
+            self.assertEqual(sub.ackdeadline, 30)
+            self.assertEqual(len(gets), 6)
+
+            # without metadata_ttl every call goes to service
+            ams.metadata_ttl = None
+            ams.get_sub("subscription1", retobj=True)
+            ams.has_sub("subscription1")
+            self.assertEqual(len(gets), 8)
+
+    # Test objects freed between lookups of registry are fetched again
+    def testRegistryVanishedObject(self):
+        class VanishingRegistry(dict):
+            # evicted object collected after membership check
+            def __contains__(self, key):
+                return True
+
+        self.ams.topics = VanishingRegistry()
+        self.ams.subs = VanishingRegistry()
+        with HTTMock(self.topicmocks.get_topic_mock, self.submocks.get_sub_mock):
+            topic = self.ams.get_topic("topic1", retobj=True)
+            self.assertIs(self.ams.topics["/projects/TEST/topics/topic1"], topic)
+            sub = self.ams.get_sub("subscription1", retobj=True)
+            self.assertIs(self.ams.subs["/projects/TEST/subscriptions/subscription1"], sub)
+
+    def testRegistry(self):
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/topics/topic\d",
+                  method="GET")
+        def get_topic_mock(url, request):
+            return response(200, '{"name": "%s"}' % url.path[3:], None, None, 5, request)
+
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", registry_size=2)
+        with HTTMock(get_topic_mock):
+            topic1 = ams.get_topic("topic1", retobj=True)
+            ams.get_topic("topic2", retobj=True)
+            ams.get_topic("topic3", retobj=True)
+
+        self.assertEqual(list(ams.topics.keys()), ["/projects/TEST/topics/topic2",
+                                                   "/projects/TEST/topics/topic3"])
+        self.assertEqual(ams.registry_stats()["topics"]["evictions"], 1)
+
+        # evicted object still in use is returned and kept again
+        self.assertIs(ams.topics["/projects/TEST/topics/topic1"], topic1)
+        self.assertEqual(list(ams.topics.keys()), ["/projects/TEST/topics/topic3",
+                                                   "/projects/TEST/topics/topic1"])
+
+        # invalidation covers evicted objects still in use
+        gets = list()
+
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/topics/topic\d",
+                  method="GET")
+        def count_topic_mock(url, request):
+            gets.append(url.path)
+            return get_topic_mock(url, request)
+
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", registry_size=1, metadata_ttl=600)
+        with HTTMock(count_topic_mock):
+            topic1 = ams.get_topic("topic1", retobj=True)
+            ams.get_topic("topic2", retobj=True)
+            ams.invalidate_topic()
+            self.assertIs(ams.get_topic("topic1", retobj=True), topic1)
+        self.assertEqual(len(gets), 3)
+
+        registry = AmsRegistry(maxsize=1)
+        registry["a"] = AmsTopic("/projects/TEST/topics/a", init=ams)
+        registry["b"] = AmsTopic("/projects/TEST/topics/b", init=ams)
+        gc.collect()
+        self.assertNotIn("a", registry)
+        self.assertIsNone(registry.get("a"))
+        self.assertEqual(registry.stats(), {"hits": 0, "misses": 1, "evictions": 1,
+                                            "size": 1, "maxsize": 1})
+        del registry["b"]
+        self.assertEqual(len(registry), 0)
+
+        self.assertEqual(self.ams.registry_stats(), {})
+
+    def testBulk(self):
+        methods = list()
+
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/.*")
+        def admin_mock(url, request):
+            methods.append((request.method, url.path))
+            if url.path.endswith(":modifyAcl"):
+                return response(200, '', None, None, 5, request)
+            if "subscriptions" in url.path:
+                return response(404, '{"error": {"code": 404, "message": "Topic does not exist",\
+                                "status": "NOT_FOUND"}}', None, None, 5, request)
+            return response(200, '{"name": "%s"}' % url.path[3:], None, None, 5, request)
+
+        operations = [("create_topic", ("topic%d" % i,)) for i in range(10)]
+        operations.append(("modifyacl_topic", ("topic1", ["user1"])))
+        operations.append(("create_sub", ("sub1", "missing"), {"ackdeadline": 20}))
+
+        with HTTMock(admin_mock):
+            results = self.ams.bulk(operations, workers=4)
+
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(isinstance(r, AmsBulkResult) for r in results))
+        self.assertEqual([r.result["name"] for r in results[:10]],
+                         ["/projects/TEST/topics/topic%d" % i for i in range(10)])
+        self.assertIs(results[10].operation, operations[10])
+        self.assertTrue(results[10].ok)
+        self.assertFalse(results[11].ok)
+        self.assertIsInstance(results[11].error, AmsServiceException)
+        # no pre-fetch of topic for modifyacl_topic and create_sub
+        self.assertNotIn("GET", [m for m, _ in methods])
+        self.assertEqual(self.ams.topics["/projects/TEST/topics/topic1"].acls, ["user1"])
+
+        self.assertRaises(ValueError, self.ams.bulk, [("get_topic", ("topic1",))])
+        self.assertEqual(self.ams.bulk([]), [])
+
     # Test List Subscriptions client request
     def testListSubscriptions(self):
         # Mock response for GET Subscriptions request
@@ -350,6 +769,69 @@ class TestClient(unittest.TestCase):
         with HTTMock(self.submocks.get_sub_mock):
             self.assertTrue(self.ams.has_sub('subscription1'))
 
+    # Test that all requests go through one pooled session
+    def testSessionPool(self):
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", pool_maxsize=20,
+                                   keepalive=False)
+        adapter = ams.session.get_adapter("https://localhost")
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual(ams.session.headers['Connection'], 'close')
+
+        orig_request = requests.Session.request
+        with mock.patch.object(requests.Session, 'request', autospec=True,
+                               side_effect=orig_request) as mock_request:
+            with HTTMock(self.topicmocks.get_topic_mock,
+                         self.submocks.get_sub_mock):
+                ams.get_topic('topic1')
+                ams.get_sub('subscription1')
+        sessions = [c[0][0] for c in mock_request.call_args_list]
+        self.assertEqual(sessions, [ams.session, ams.session])
+
+    # Test that concurrent pulls from shared client don't mix pull options
+    def testConcurrentPull(self):
+        @urlmatch(netloc="localhost",
+                  path=r"/v1/projects/TEST/subscriptions/subscription\d+:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            # echo maxMessages of the request back in message data
+            req_body = json.loads(request.body)
+            num = int(req_body["maxMessages"])
+            msgs = [{"ackId": "projects/TEST/subscriptions/subscription{0}:{1}".format(num, i),
+                     "message": {"messageId": str(i),
+                                 "data": AmsMessage(data=str(num)).dict()["data"],
+                                 "publishTime": "2016-02-24T11:55:09.786127994Z"}}
+                    for i in range(num)]
+            return json.dumps({"receivedMessages": msgs})
+
+        nthreads = 16
+        errors = list()
+        headers = {"Accept": "application/json"}
+
+        def consume(num):
+            try:
+                for i in range(20):
+                    msgs = self.ams.pull_sub("subscription{0}".format(num),
+                                             num, headers=headers)
+                    assert len(msgs) == num
+                    for ackid, msg in msgs:
+                        assert ackid.startswith("projects/TEST/subscriptions/subscription{0}:".format(num))
+                        assert msg.get_data() == str(num).encode()
+            except Exception as e:
+                errors.append(e)
+
+        with HTTMock(pull_mock):
+            threads = [threading.Thread(target=consume, args=(n,))
+                       for n in range(1, nthreads + 1)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.ams.get_pullopt("maxMessages"), "1")
+        self.assertEqual(headers, {"Accept": "application/json"})
+
 
 if __name__ == '__main__':
     unittest.main()
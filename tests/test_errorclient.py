@@ -9,6 +9,8 @@ from pymod import ArgoMessagingService
 from pymod import AmsMessage
 from pymod import AmsTopic
 from pymod import AmsSubscription
+from pymod import AmsRetryPolicy, AmsRetryBudget
+from pymod import AmsCircuitBreaker, AmsCircuitOpenException
 from pymod import (AmsServiceException, AmsConnectionException,
                    AmsTimeoutException, AmsBalancerException, AmsException)
 
@@ -156,7 +158,7 @@ class TestErrorClient(unittest.TestCase):
                 self.assertEqual(e.status, 'INVALID_ARGUMENT')
                 self.assertEqual(e.msg, "While trying the [sub_mod_offset]: Offset out of bounds")
 
-    @mock.patch('pymod.ams.requests.get')
+    @mock.patch('pymod.ams.requests.Session.get')
     def testRetryConnectionProblems(self, mock_requests_get):
         mock_requests_get.side_effect = [requests.exceptions.ReadTimeout,
                                          requests.exceptions.ConnectionError,
@@ -171,7 +173,7 @@ class TestErrorClient(unittest.TestCase):
         self.assertRaises(AmsConnectionException, self.ams.list_topics)
         self.assertEqual(mock_requests_get.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.get')
+    @mock.patch('pymod.ams.requests.Session.get')
     def testBackoffRetryConnectionProblems(self, mock_requests_get):
         mock_requests_get.side_effect = [requests.exceptions.ConnectionError,
                                          requests.exceptions.ConnectionError,
@@ -187,7 +189,7 @@ class TestErrorClient(unittest.TestCase):
         self.assertRaises(AmsConnectionException, self.ams.list_topics)
         self.assertEqual(mock_requests_get.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.post')
+    @mock.patch('pymod.ams.requests.Session.post')
     def testRetryAmsBalancerTimeout408(self, mock_requests_post):
         retry = 4
         retrysleep = 0.2
@@ -204,7 +206,7 @@ class TestErrorClient(unittest.TestCase):
             self.assertEqual(e.msg, 'While trying the [sub_pull]: ' + errmsg)
         self.assertEqual(mock_requests_post.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.post')
+    @mock.patch('pymod.ams.requests.Session.post')
     def testRetryAmsBalancer502(self, mock_requests_post):
         retry = 4
         retrysleep = 0.2
@@ -221,7 +223,7 @@ class TestErrorClient(unittest.TestCase):
             self.assertEqual(e.msg, 'While trying the [sub_pull]: ' + errmsg)
         self.assertEqual(mock_requests_post.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.post')
+    @mock.patch('pymod.ams.requests.Session.post')
     def testRetryAmsBalancer503(self, mock_requests_post):
         retry = 4
         retrysleep = 0.2
@@ -238,7 +240,7 @@ class TestErrorClient(unittest.TestCase):
             self.assertEqual(e.msg, 'While trying the [sub_pull]: ' + errmsg)
         self.assertEqual(mock_requests_post.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.post')
+    @mock.patch('pymod.ams.requests.Session.post')
     def testRetryAmsBalancerTimeout504(self, mock_requests_post):
         retry = 4
         retrysleep = 0.2
@@ -255,7 +257,7 @@ class TestErrorClient(unittest.TestCase):
             self.assertEqual(e.msg, 'While trying the [sub_pull]: ' + errmsg)
         self.assertEqual(mock_requests_post.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.get')
+    @mock.patch('pymod.ams.requests.Session.get')
     def testRetryAckDeadlineAmsTimeout(self, mock_requests_get):
         mock_response = mock.create_autospec(requests.Response)
         mock_response.status_code = 408
@@ -272,7 +274,104 @@ class TestErrorClient(unittest.TestCase):
         self.assertRaises(AmsTimeoutException, self.ams.list_topics)
         self.assertEqual(mock_requests_get.call_count, retry + 1)
 
-    @mock.patch('pymod.ams.requests.post')
+    @mock.patch('pymod.ams.time.sleep')
+    @mock.patch('pymod.ams.requests.Session.get')
+    def testRetryPolicy(self, mock_requests_get, mock_sleep):
+        mock_requests_get.side_effect = requests.exceptions.ConnectionError
+        policy = AmsRetryPolicy(retries=3, base=1, cap=2, jitter='full')
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", retry_policy=policy)
+        # policy takes precedence over retry arguments
+        self.assertRaises(AmsConnectionException, ams.list_topics)
+        self.assertEqual(mock_requests_get.call_count, 4)
+        sleeps = [c[0][0] for c in mock_sleep.call_args_list]
+        self.assertEqual(len(sleeps), 3)
+        assert 0 <= sleeps[0] <= 1 and all(0 <= t <= 2 for t in sleeps)
+
+        stats = ams.retry_stats()["topic_list"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["retries"], 3)
+        self.assertEqual(stats["gave_up_exhausted"], 1)
+        self.assertAlmostEqual(stats["sleep_seconds"], sum(sleeps))
+
+        # service errors are not retried
+        mock_response = mock.create_autospec(requests.Response)
+        mock_response.status_code = 404
+        mock_response.content = '{"error": {"code": 404, "message": "Topic does not exist", "status": "NOT_FOUND"}}'
+        mock_requests_get.side_effect = None
+        mock_requests_get.return_value = mock_response
+        mock_requests_get.reset_mock()
+        self.assertRaises(AmsServiceException, ams.get_topic, "topic1")
+        self.assertEqual(mock_requests_get.call_count, 1)
+
+    @mock.patch('pymod.ams.time.sleep')
+    @mock.patch('pymod.ams.requests.Session.get')
+    def testRetryPolicyLimits(self, mock_requests_get, mock_sleep):
+        mock_requests_get.side_effect = requests.exceptions.ConnectionError
+        budget = AmsRetryBudget(capacity=2, refill_rate=0)
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t", project="TEST",
+                                   retry_policy=AmsRetryPolicy(retries=5, budget=budget),
+                                   route_retry_policies={
+                                       "sub_list": AmsRetryPolicy(retries=5, base=1,
+                                                                  jitter=None,
+                                                                  max_elapsed=3.5)})
+        # budget shared by requests of the client
+        self.assertRaises(AmsConnectionException, ams.list_topics)
+        self.assertRaises(AmsConnectionException, ams.list_topics)
+        self.assertEqual(mock_requests_get.call_count, 4)
+        self.assertEqual(ams.retry_stats()["topic_list"]["gave_up_budget"], 2)
+
+        # route policy with backoff 1, 2, 4 seconds stopped by max_elapsed
+        mock_requests_get.reset_mock()
+        mock_sleep.reset_mock()
+        self.assertRaises(AmsConnectionException, ams.list_subs)
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list], [1, 2])
+        self.assertEqual(ams.retry_stats()["sub_list"]["gave_up_elapsed"], 1)
+
+    @mock.patch('pymod.amsbreaker.time.time')
+    @mock.patch('pymod.ams.requests.Session.post')
+    def testCircuitBreaker(self, mock_requests_post, mock_time):
+        mock_time.return_value = 1000
+        mock_502 = mock.create_autospec(requests.Response)
+        mock_502.status_code = 502
+        mock_502.content = '<html><body>502 Bad Gateway</body></html>'
+        mock_ok = mock.create_autospec(requests.Response)
+        mock_ok.status_code = 200
+        mock_ok.content = '{"receivedMessages": []}'
+        mock_requests_post.return_value = mock_502
+
+        breaker = AmsCircuitBreaker(failure_threshold=3, reset_timeout=10)
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", circuit_breaker=breaker)
+        # retries count as consecutive failures and open breaker that
+        # stops the retries
+        self.assertRaises(AmsCircuitOpenException, ams.pull_sub, 'subscription1',
+                          retry=5, retrysleep=0)
+        self.assertEqual(mock_requests_post.call_count, 3)
+        self.assertEqual(breaker.state("sub_pull"), "open")
+        try:
+            ams.pull_sub('subscription1')
+        except AmsCircuitOpenException as e:
+            self.assertEqual(e.retry_after, 10)
+        self.assertEqual(mock_requests_post.call_count, 3)
+        # other routes are not affected
+        self.assertEqual(breaker.state("sub_ack"), "closed")
+
+        # failed probe opens breaker again
+        mock_time.return_value = 1011
+        self.assertEqual(breaker.state("sub_pull"), "half-open")
+        self.assertRaises(AmsBalancerException, ams.pull_sub, 'subscription1')
+        self.assertRaises(AmsCircuitOpenException, ams.pull_sub, 'subscription1')
+        self.assertEqual(mock_requests_post.call_count, 4)
+
+        # successful probe closes it
+        mock_time.return_value = 1022
+        mock_requests_post.return_value = mock_ok
+        self.assertEqual(ams.pull_sub('subscription1'), [])
+        self.assertEqual(breaker.states(), {"sub_pull": ("closed", 0),
+                                            "sub_ack": ("closed", 0)})
+
+    @mock.patch('pymod.ams.requests.Session.post')
     def testPullAckSub(self, mock_requests_post):
         mock_pull_response = mock.create_autospec(requests.Response)
         mock_pull_response.status_code = 200
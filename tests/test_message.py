@@ -3,8 +3,12 @@
 import unittest
 import sys
 
+import mock
+from binascii import a2b_base64
+
 from pymod import AmsMessage
 from pymod import AmsMessageException
+from pymod.amscompress import PAYLOAD_CODECS
 
 class TestMessage(unittest.TestCase):
     def setUp(self):
@@ -65,6 +69,46 @@ class TestMessage(unittest.TestCase):
                          '2017-03-15T17:11:34.035345612Z')
         self.assertEqual(self.message_recv.get_attr(), {'foo': 'bar'})
 
+    def test_MsgDict(self):
+        self.assertEqual(self.message_recv.dict(), {'attributes': {'foo': 'bar'},
+                                                    'data': 'YmF6',
+                                                    'messageId': '1',
+                                                    'publishTime': '2017-03-15T17:11:34.035345612Z'})
+        self.assertRaises(AmsMessageException, self.message_send_no_payload.dict)
+        if sys.version_info >= (3, ):
+            # Python 2 Callable base class doesn't define __slots__
+            self.assertFalse(hasattr(self.message_send, '__dict__'))
+
+    def test_MsgLazyDecode(self):
+        msg = AmsMessage(b64enc=False, data='YmF6', messageId='1')
+        with mock.patch('pymod.amsmsg.a2b_base64', side_effect=a2b_base64) as dec:
+            data = msg.get_data()
+            self.assertIs(msg.get_data(), data)
+            view = msg.get_data_view()
+            self.assertEqual(dec.call_count, 1)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view[1:].tobytes(), b'az')
+        msg.set_data('qux')
+        self.assertEqual(msg.get_data(), b'qux')
+
+    def test_MsgCodec(self):
+        payload = '{"metric": "check", "status": "OK"}' * 100
+        attributes = {'foo': 'bar'}
+        for codec in [c for c in ['zlib', 'lzma'] if PAYLOAD_CODECS[c]]:
+            msg = AmsMessage(data=payload, attributes=attributes, codec=codec)
+            sent = msg.dict()
+            self.assertEqual(sent['attributes'], {'foo': 'bar', 'ams-codec': codec})
+            assert len(sent['data']) < len(AmsMessage(data=payload).dict()['data'])
+            recv = AmsMessage(b64enc=False, messageId='1', **sent)
+            self.assertEqual(recv.get_data(), payload.encode('utf-8'))
+        self.assertEqual(attributes, {'foo': 'bar'})
+
+        msg.set_data('baz')
+        self.assertEqual(msg.dict(), {'attributes': {'foo': 'bar'}, 'data': 'YmF6'})
+        self.assertRaises(AmsMessageException, AmsMessage, data='baz', codec='nosuchcodec')
+        faulty = AmsMessage(b64enc=False, data='YmF6', attributes={'ams-codec': 'zlib'})
+        self.assertRaises(AmsMessageException, faulty.get_data)
+
     def test_MsgFaulty(self):
         self.assertRaises(AmsMessageException, self.message_recv_faulty.get_data)
         self.assertRaises(AmsMessageException, self.message_send_no_payload.get_data)
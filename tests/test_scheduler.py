@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+import unittest
+
+from httmock import urlmatch, HTTMock
+from pymod import AmsConsumerScheduler
+from pymod import AmsMessage
+from pymod import AmsSubscription
+from pymod import AmsTopic
+from pymod import ArgoMessagingService
+
+
+class TestConsumerScheduler(unittest.TestCase):
+    def setUp(self):
+        self.ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                        project="TEST")
+        self.ams.topics['/projects/TEST/topics/topic1'] = \
+            AmsTopic('/projects/TEST/topics/topic1', self.ams)
+        self.subs = [AmsSubscription('/projects/TEST/subscriptions/{0}'.format(name),
+                                     '/projects/TEST/topics/topic1',
+                                     {'pushEndpoint': None}, 10, self.ams)
+                     for name in ['busy', 'idle']]
+        # messages waiting in each subscription
+        self.backlog = {'busy': 5, 'idle': 0}
+        self.acks = list()
+        self.lock = threading.Lock()
+
+    def mocks(self):
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/subscriptions/\w+:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            sub = url.path.split('/')[-1].split(':')[0]
+            num = int(json.loads(request.body)["maxMessages"])
+            self.assertEqual(json.loads(request.body)["returnImmediately"], "true")
+            with self.lock:
+                count = min(num, self.backlog[sub])
+                self.backlog[sub] -= count
+            msgs = [{"ackId": "projects/TEST/subscriptions/{0}:{1}".format(sub, i),
+                     "message": {"messageId": str(i), "data": "Zm9v",
+                                 "publishTime": "2016-02-24T11:55:09.786127994Z"}}
+                    for i in range(count)]
+            return json.dumps({"receivedMessages": msgs})
+
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/subscriptions/\w+:acknowledge",
+                  method="POST")
+        def ack_mock(url, request):
+            with self.lock:
+                self.acks.append(json.loads(request.body)["ackIds"])
+            return '{}'
+
+        return pull_mock, ack_mock
+
+    def wait_for(self, cond, timeout=5):
+        end = time.time() + timeout
+        while not cond() and time.time() < end:
+            time.sleep(0.01)
+        return cond()
+
+    def testConsume(self):
+        consumed = list()
+
+        def callback(sub, msgs):
+            for ackid, msg in msgs:
+                assert isinstance(msg, AmsMessage)
+                consumed.append((sub.name, msg.get_msgid()))
+
+        with HTTMock(*self.mocks()):
+            with AmsConsumerScheduler(self.subs, callback, workers=2, batch=2,
+                                      min_interval=0.01, max_interval=0.05,
+                                      max_concurrency=2) as scheduler:
+                self.assertTrue(self.wait_for(lambda: len(consumed) == 5))
+                self.assertTrue(self.wait_for(
+                    lambda: scheduler.stats()['idle']['interval'] == 0.05))
+
+            stats = scheduler.stats()
+            self.assertEqual(stats['busy']['messages'], 5)
+            self.assertEqual(stats['idle']['messages'], 0)
+            self.assertEqual(stats['idle']['pulls'], stats['idle']['empty_pulls'])
+            self.assertEqual(len(self.acks), 3)
+            self.assertTrue(all(c[0] == 'busy' for c in consumed))
+
+    def testConcurrencyAckOffset(self):
+        # subscription pulling from the acknowledged offset
+        offset = {'busy': 0}
+        delivered = list()
+        threads = set()
+
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/subscriptions/busy:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            num = int(json.loads(request.body)["maxMessages"])
+            with self.lock:
+                start = offset['busy']
+            msgs = [{"ackId": "projects/TEST/subscriptions/busy:{0}".format(i),
+                     "message": {"messageId": str(i), "data": "Zm9v",
+                                 "publishTime": "2016-02-24T11:55:09.786127994Z"}}
+                    for i in range(start, min(start + num, 9))]
+            return json.dumps({"receivedMessages": msgs})
+
+        @urlmatch(netloc="localhost", path=r"/v1/projects/TEST/subscriptions/busy:acknowledge",
+                  method="POST")
+        def ack_mock(url, request):
+            ids = json.loads(request.body)["ackIds"]
+            with self.lock:
+                offset['busy'] = max(int(i.rsplit(':', 1)[1]) for i in ids) + 1
+            return '{}'
+
+        def callback(sub, msgs):
+            time.sleep(0.01)
+            with self.lock:
+                threads.add(threading.current_thread().name)
+                delivered.extend(msg.get_msgid() for _, msg in msgs)
+
+        with HTTMock(pull_mock, ack_mock):
+            with AmsConsumerScheduler(self.subs[:1], callback, workers=2, batch=3,
+                                      min_interval=0.01, max_concurrency=3):
+                self.assertTrue(self.wait_for(lambda: offset['busy'] == 9))
+
+        self.assertEqual(sorted(delivered), [str(i) for i in range(9)])
+        self.assertTrue(len(threads) > 1)
+
+    def testCallbackError(self):
+        def callback(sub, msgs):
+            raise ValueError('processing failed')
+
+        with HTTMock(*self.mocks()):
+            scheduler = AmsConsumerScheduler(self.subs[:1], callback, workers=1,
+                                             batch=10, min_interval=0.01)
+            scheduler.start()
+            self.assertTrue(self.wait_for(lambda: scheduler.stats()['busy']['errors']))
+            scheduler.stop()
+
+        # messages of failed callback are not acknowledged
+        self.assertEqual(self.acks, [])
+        self.assertIsInstance(scheduler.stats()['busy']['last_error'], ValueError)
+
+    def testRemove(self):
+        with HTTMock(*self.mocks()):
+            scheduler = AmsConsumerScheduler(self.subs, lambda sub, msgs: None,
+                                             min_interval=0.01)
+            scheduler.remove('idle')
+            self.assertEqual(list(scheduler.stats().keys()), ['busy'])
+            scheduler.start()
+            self.assertTrue(self.wait_for(lambda: self.backlog['busy'] == 0))
+            scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
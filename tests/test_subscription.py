@@ -1,10 +1,12 @@
 import unittest
 import json
 import sys
+import threading
+import time
 
 import datetime
 from httmock import urlmatch, HTTMock, response
-from pymod import AmsMessage
+from pymod import AmsMessage, AmsMessageBatch
 from pymod import AmsServiceException, AmsException
 from pymod import AmsSubscription
 from pymod import AmsTopic
@@ -107,6 +109,258 @@ class TestSubscription(unittest.TestCase):
             resp_ack = sub.ack(["1221"])
             self.assertEqual(resp_ack, True)
 
+    def testStream(self):
+        state, pull_mock, ack_mock = self._offset_server(10)
+        with HTTMock(pull_mock, ack_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+            msgs = list()
+            for ackid, msg in sub.stream(batch=3, prefetch=2, return_immediately=True):
+                msgs.append((ackid, msg))
+                sub.ack([ackid])
+            self.assertEqual([ackid for ackid, _ in msgs],
+                             ["projects/TEST/subscriptions/subscription1:{0}".format(i)
+                              for i in range(10)])
+            self.assertEqual(msgs[4][1].get_data(), b'foo4')
+
+            # closing the generator stops background pulls
+            state["offset"] = 0
+            state["pulls"] = 0
+            stream = sub.stream(batch=1, prefetch=1, return_immediately=True)
+            ackid, msg = next(stream)
+            self.assertEqual(msg.get_msgid(), "0")
+            stream.close()
+            time.sleep(0.3)
+            assert state["pulls"] <= 3
+
+    def testStreamAckOffset(self):
+        state, pull_mock, ack_mock = self._offset_server(9)
+        with HTTMock(pull_mock, ack_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+            msgids = list()
+            for ackid, msg in sub.stream(batch=3, prefetch=2, return_immediately=True):
+                msgids.append(msg.get_msgid())
+                sub.ack([ackid])
+            # messages pulled again before they were acked are not yielded twice
+            self.assertEqual(msgids, [str(i) for i in range(9)])
+            self.assertEqual(state["offset"], 9)
+
+        state, pull_mock, ack_mock = self._offset_server(9)
+        with HTTMock(pull_mock, ack_mock):
+            msgids = list()
+            with sub.ack_manager(max_pending=3) as manager:
+                for ackid, msg in sub.stream(batch=3, prefetch=2, return_immediately=True,
+                                             ack_manager=manager):
+                    msgids.append(msg.get_msgid())
+                    manager.ack(ackid)
+            self.assertEqual(msgids, [str(i) for i in range(9)])
+            self.assertEqual(state["offset"], 9)
+
+        # acks collected below max_pending don't hold back the next pull
+        state, pull_mock, ack_mock = self._offset_server(9)
+        with HTTMock(pull_mock, ack_mock):
+            msgids = list()
+            start = time.time()
+            with sub.ack_manager(max_pending=1000) as manager:
+                for ackid, msg in sub.stream(batch=3, prefetch=1, return_immediately=True,
+                                             ack_manager=manager):
+                    msgids.append(msg.get_msgid())
+                    manager.ack(ackid)
+            self.assertEqual(msgids, [str(i) for i in range(9)])
+            self.assertEqual(state["offset"], 9)
+            self.assertLess(time.time() - start, 2)
+
+    def testStreamError(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            return response(404, '{"error":{"code": 404,"message":"Subscription does not exist",\
+                            "status":"NOT_FOUND"}}', None, None, 5, request)
+
+        with HTTMock(pull_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+            self.assertRaises(AmsServiceException, list, sub.stream())
+
+    def testAckManager(self):
+        acks = list()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:acknowledge",
+                  method="POST")
+        def ack_mock(url, request):
+            acks.append(json.loads(request.body)["ackIds"])
+            return '{}'
+
+        ackid = "projects/TEST/subscriptions/subscription1:{0}"
+        with HTTMock(ack_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+
+            # only the highest offset is sent when max_pending is reached
+            with sub.ack_manager(max_pending=5, interval=60) as manager:
+                self.assertEqual(manager.interval, 5)
+                manager.ack([ackid.format(i) for i in (3, 1, 4)])
+                manager.ack(ackid.format(2))
+                self.assertEqual(acks, [])
+                manager.ack(ackid.format(5))
+                manager.flush()
+                self.assertEqual(acks, [[ackid.format(5)]])
+                manager.ack(ackid.format(6))
+            self.assertEqual(acks, [[ackid.format(5)], [ackid.format(6)]])
+            self.assertEqual(manager.acks_sent, 2)
+            self.assertEqual(manager.ids_acked, 6)
+
+            # collected ackIds are sent when interval expires
+            del acks[:]
+            manager = sub.ack_manager(interval=0.05)
+            manager.ack(ackid.format(7))
+            time.sleep(0.3)
+            self.assertEqual(acks, [[ackid.format(7)]])
+            manager.close()
+            self.assertRaises(AmsException, manager.ack, ackid.format(8))
+
+            # ack is sent at the latest half of ackdeadline after the pull
+            del acks[:]
+            with sub.ack_manager(interval=60) as manager:
+                manager.ack(ackid.format(8), pulled_at=time.time() - 6)
+                time.sleep(0.2)
+                self.assertEqual(acks, [[ackid.format(8)]])
+                manager.pulled([ackid.format(i) for i in (9, 10)], time.time() - 4.9)
+                manager.ack(ackid.format(9))
+                self.assertEqual(len(acks), 1)
+                time.sleep(0.3)
+                self.assertEqual(acks, [[ackid.format(8)], [ackid.format(9)]])
+
+    def testPullBatch(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            return '{"receivedMessages":[{"ackId":"projects/TEST/subscriptions/subscription1:1221",\
+                    "message":{"messageId":"1221","attributes":{"foo":"bar"},"data":"YmFzZTY0ZW5jb2RlZA==",\
+                    "publishTime":"2016-02-24T11:55:09.786127994Z"}},\
+                    {"ackId":"projects/TEST/subscriptions/subscription1:1222",\
+                    "message":{"messageId":"1222","attributes":{"foo":"bar"},\
+                    "publishTime":"2016-02-24T11:55:09.786127995Z"}}]}'
+
+        with HTTMock(pull_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+            batch = sub.pull(num=2, as_batch=True)
+            self.assertIsInstance(batch, AmsMessageBatch)
+            self.assertEqual(len(batch), 2)
+            self.assertEqual(batch.ack_ids, ["projects/TEST/subscriptions/subscription1:1221",
+                                             "projects/TEST/subscriptions/subscription1:1222"])
+            self.assertEqual(batch.message_ids, ["1221", "1222"])
+            self.assertEqual(batch.decode(), [b"base64encoded", None])
+            ackid, msg = batch[0]
+            self.assertEqual(ackid, "projects/TEST/subscriptions/subscription1:1221")
+            self.assertIs(msg.get_data(), batch.get_data(0))
+            self.assertEqual(msg.get_publishtime(), "2016-02-24T11:55:09.786127994Z")
+            msgs = list(batch)
+            self.assertEqual(msgs[1][1].get_attr(), {"foo": "bar"})
+            self.assertEqual(msgs[1][1].get_msgid(), "1222")
+            # slices behave as slices of list of (ackId, AmsMessage) tuples
+            self.assertEqual([ackid for ackid, _ in batch[1:]],
+                             ["projects/TEST/subscriptions/subscription1:1222"])
+            self.assertEqual([m.get_msgid() for _, m in batch[::-1]], ["1222", "1221"])
+            self.assertEqual(batch[5:], [])
+
+    def testIterPull(self):
+        received = [{"ackId": "projects/TEST/subscriptions/subscription1:{0}".format(i),
+                     "message": {"messageId": str(i), "attributes": {"foo": u"b\u00e4r"},
+                                 "data": AmsMessage(data='foo{0}'.format(i) * 100).dict()["data"],
+                                 "publishTime": "2016-02-24T11:55:09.786127994Z"}}
+                    for i in range(20)]
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            return json.dumps({"receivedMessages": received}, indent=1, ensure_ascii=False)
+
+        with HTTMock(pull_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+            msgs = list(sub.iter_pull(num=20, chunk_size=7))
+            self.assertEqual(len(msgs), 20)
+            self.assertEqual(msgs[3][0], "projects/TEST/subscriptions/subscription1:3")
+            self.assertEqual(msgs[3][1].get_data(), b'foo3' * 100)
+            self.assertEqual(msgs[19][1].get_attr(), {"foo": u"b\u00e4r"})
+
+        # incomplete and empty responses
+        self.assertEqual(list(self.ams._iter_received([b'{"receivedMessages": []}'])), [])
+        self.assertEqual(list(self.ams._iter_received([b'{}'])), [])
+        self.assertRaises(ValueError, list,
+                          self.ams._iter_received([b'{"receivedMessages": [{"ackId": "1"']))
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_truncated_mock(url, request):
+            return '{"receivedMessages": [{"ackId": "1", "message": {"data": "Zm9v"}}, {"ack'
+
+        with HTTMock(pull_truncated_mock):
+            msgs = self.ams.iter_pull_sub('subscription1', 2)
+            self.assertEqual(next(msgs)[1].get_data(), b'foo')
+            self.assertRaises(AmsServiceException, next, msgs)
+
+    def _offset_server(self, total, failacks=0):
+        # emulates subscription that pulls from the acknowledged offset
+        state = {"offset": 0, "failacks": failacks, "acks": list(), "pulls": 0}
+        lock = threading.Lock()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:pull",
+                  method="POST")
+        def pull_mock(url, request):
+            num = int(json.loads(request.body)["maxMessages"])
+            with lock:
+                start = state["offset"]
+                state["pulls"] += 1
+            msgs = [{"ackId": "projects/TEST/subscriptions/subscription1:{0}".format(i),
+                     "message": {"messageId": str(i),
+                                 "data": AmsMessage(data='foo{0}'.format(i)).dict()["data"],
+                                 "publishTime": "2016-02-24T11:55:09.786127994Z"}}
+                    for i in range(start, min(start + num, total))]
+            return json.dumps({"receivedMessages": msgs})
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/subscriptions/subscription1:acknowledge",
+                  method="POST")
+        def ack_mock(url, request):
+            ids = json.loads(request.body)["ackIds"]
+            with lock:
+                state["acks"].append(ids)
+                if state["failacks"]:
+                    state["failacks"] -= 1
+                    return response(408, '{"error": {"code": 408, "message": "Ams Timeout",\
+                                    "status": "TIMEOUT"}}', None, None, 5, request)
+                state["offset"] = int(ids[-1].rsplit(':', 1)[1]) + 1
+            return '{}'
+
+        return state, pull_mock, ack_mock
+
+    def testIterPullAck(self):
+        state, pull_mock, ack_mock = self._offset_server(10)
+        with HTTMock(pull_mock, ack_mock, self.submocks.get_sub_mock,
+                     self.topicmocks.get_topic_mock):
+            sub = self.ams.get_sub('subscription1', retobj=True)
+            msgids = list()
+            for msgs in sub.iter_pullack(num=3, return_immediately=True):
+                msgids.extend(msg.get_msgid() for msg in msgs)
+            self.assertEqual(msgids, [str(i) for i in range(10)])
+            self.assertEqual(state["offset"], 10)
+            # overlapping pull returns the next batch even if it reached
+            # service before the acknowledgement of the previous one
+            self.assertEqual(state["pulls"], 6)
+
+    def testIterPullAckFailedAck(self):
+        state, pull_mock, ack_mock = self._offset_server(4, failacks=1)
+        with HTTMock(pull_mock, ack_mock):
+            batches = list(self.ams.iter_pullack_sub('subscription1', 2,
+                                                     return_immediately=True))
+            self.assertEqual([[m.get_msgid() for m in b] for b in batches],
+                             [["0", "1"], ["2", "3"]])
+            # failed ack is followed by new pull and ack of the same batch
+            self.assertEqual(state["acks"][0], state["acks"][1])
+
     def testOffsets(self):
         # Mock response for GET subscriptions offsets
         @urlmatch(netloc="localhost",
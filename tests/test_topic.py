@@ -41,6 +41,81 @@ class TestTopic(unittest.TestCase):
             self.assertEqual(topic.name, 'topic1')
             self.assertEqual(topic.fullname, '/projects/TEST/topics/topic1')
 
+    def testBatchPublisher(self):
+        bodies = list()
+
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            req_body = json.loads(request.body)
+            bodies.append(request.body)
+            start = sum(len(json.loads(b)["messages"]) for b in bodies[:-1])
+            ids = [str(start + i) for i in range(len(req_body["messages"]))]
+            return json.dumps({"messageIds": ids})
+
+        with HTTMock(self.topicmocks.has_topic_mock, publish_mock):
+            topic = self.ams.topic('topic1')
+            with topic.batch_publisher(max_messages=4, max_latency=60) as publisher:
+                futures = [publisher.publish(AmsMessage(data='foo{0}'.format(i)))
+                           for i in range(10)]
+                self.assertEqual(futures[0].result(timeout=5), "0")
+                self.assertEqual(futures[7].result(timeout=5), "7")
+            self.assertEqual([f.result() for f in futures],
+                             [str(i) for i in range(10)])
+            self.assertEqual([len(json.loads(b)["messages"]) for b in bodies],
+                             [4, 4, 2])
+
+            # batches are cut on serialized size and on linger time
+            del bodies[:]
+            msg_size = len(json.dumps(AmsMessage(data='foo0').dict()))
+            publisher = topic.batch_publisher(max_bytes=16 + 3 * (msg_size + 2),
+                                              max_latency=0.01)
+            futures = [publisher.publish(AmsMessage(data='foo{0}'.format(i)))
+                       for i in range(7)]
+            self.assertEqual(futures[-1].result(timeout=5), "6")
+            publisher.close()
+            for b in bodies:
+                assert len(b) <= publisher.max_bytes
+            self.assertEqual(sum(len(json.loads(b)["messages"]) for b in bodies), 7)
+
+        # sizes are measured with json_codec of the client
+        class CompactCodec(object):
+            def dumps(self, obj):
+                return json.dumps(obj, separators=(',', ':'))
+
+            def loads(self, s):
+                return json.loads(s)
+
+        del bodies[:]
+        ams = ArgoMessagingService(endpoint="localhost", token="s3cr3t",
+                                   project="TEST", json_codec=CompactCodec())
+        msg_size = len(CompactCodec().dumps(AmsMessage(data='foo0').dict()))
+        with HTTMock(self.topicmocks.has_topic_mock, publish_mock):
+            topic = ams.topic('topic1')
+            with topic.batch_publisher(max_bytes=15 + 3 * (msg_size + 1),
+                                       max_latency=60) as publisher:
+                futures = [publisher.publish(AmsMessage(data='foo{0}'.format(i)))
+                           for i in range(6)]
+            self.assertEqual([f.result() for f in futures], [str(i) for i in range(6)])
+            self.assertEqual([len(json.loads(b)["messages"]) for b in bodies], [3, 3])
+            for b in bodies:
+                assert len(b) <= publisher.max_bytes
+
+    def testBatchPublisherError(self):
+        @urlmatch(netloc="localhost", path="/v1/projects/TEST/topics/topic1:publish",
+                  method="POST")
+        def publish_mock(url, request):
+            return response(413, '{"error":{"code": 413,"message":"Message size too large",\
+                            "status":"INVALID_ARGUMENT"}}', None, None, 5, request)
+
+        with HTTMock(self.topicmocks.has_topic_mock, publish_mock):
+            topic = self.ams.topic('topic1')
+            publisher = topic.batch_publisher()
+            future = publisher.publish(self.msg)
+            publisher.flush()
+            self.assertRaises(AmsServiceException, future.result)
+            publisher.close()
+
     def testSubscription(self):
         # Execute ams client with mocked response
         with HTTMock(self.topicmocks.create_topic_mock,
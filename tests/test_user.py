@@ -3,7 +3,7 @@ import unittest
 
 from httmock import urlmatch, response, HTTMock
 
-from pymod import AmsUser, AmsUserProject
+from pymod import AmsUser, AmsUserProject, AmsUserRecord
 from pymod import ArgoMessagingService
 
 
@@ -321,6 +321,32 @@ class TestUser(unittest.TestCase):
             self.assertEqual(self.default_user.projects[1].subscriptions, users_page.users[0].projects[1].subscriptions)
             self.assertEqual(self.default_user.projects[1].topics, users_page.users[0].projects[1].topics)
 
+    def testIterUsers(self):
+        tokens = list()
+
+        @urlmatch(**self.users_list_urlmatch)
+        def list_users_mock(url, request):
+            self.assertTrue("pageSize=1" in url.query)
+            tokens.append(url.query.split("nextPageToken=")[1].split("&")[0])
+            if "nextPageToken=token" in url.query:
+                return response(200, self.users_json.replace('"nextPageToken":"token"', '"nextPageToken":""'),
+                                None, None, 5, request)
+            return response(200, self.users_json, None, None, 5, request)
+
+        with HTTMock(list_users_mock):
+            users = list(self.ams.iter_users(page_size=1))
+            self.assertEqual(["", "token"], tokens)
+            self.assertEqual(2, len(users))
+            self.assertTrue(isinstance(users[0], AmsUser))
+            self.assertEqual(self.default_user.projects[0].topics, users[1].projects[0].topics)
+
+            records = list(self.ams.iter_users(page_size=1, lazy=True))
+            self.assertTrue(isinstance(records[0], AmsUserRecord))
+            self.assertEqual(self.default_user.name, records[0].name)
+            self.assertIsNone(records[0]._user)
+            self.assertEqual(self.default_user.projects[1].roles, records[0].projects[1].roles)
+            self.assertIs(records[0].user(), records[0].user())
+
     def testDeleteUser(self):
         @urlmatch(**self.delete_user_urlmatch)
         def delete_user_mock(url, request):